@@ -0,0 +1,152 @@
+import csv
+import re
+import tkinter as tk
+import numpy as np
+
+ROW_HEIGHT = 20
+
+class AccountStore:
+    # Accounts kept column-wise so filtering and selection are NumPy operations;
+    # optional `group` and `tags` (separated by ';') columns come from data.csv
+    def __init__(self, rows):
+        self.rows = rows
+        self.usernames = np.array([row['username'] for row in rows], dtype=object)
+        self.lower_usernames = np.array([name.lower() for name in self.usernames], dtype=object)
+        self.funds = np.array([float(row.get('available_funds') or 0) for row in rows])
+        self.groups = np.array([(row.get('group') or '').lower() for row in rows], dtype=object)
+        self.tags = [frozenset(tag.strip().lower() for tag in (row.get('tags') or '').split(';') if tag.strip())
+                     for row in rows]
+        self.selected = np.zeros(len(rows), dtype=bool)
+        self.view = np.arange(len(rows))
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, newline='') as csvfile:
+            return cls(list(csv.DictReader(csvfile)))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def match(self, expression):
+        # Terms are ANDed: funds>1000, funds<=500, group:alpha, tag:swing, or text in the username
+        mask = np.ones(len(self.rows), dtype=bool)
+        for term in expression.split():
+            term = term.lower()
+            funds = re.fullmatch(r'funds(>=|<=|==|!=|>|<|=)(.*)', term)
+            if funds:
+                op = funds.group(1)
+                try:
+                    value = float(funds.group(2))
+                except ValueError:
+                    continue  # Still being typed (funds>, funds>.), so it doesn't filter yet
+                mask &= {'>': np.greater, '<': np.less, '>=': np.greater_equal, '<=': np.less_equal,
+                         '=': np.equal, '==': np.equal, '!=': np.not_equal}[op](self.funds, value)
+            elif term.startswith('group:'):
+                mask &= self.groups == term[len('group:'):]
+            elif term.startswith('tag:'):
+                tag = term[len('tag:'):]
+                mask &= np.fromiter((tag in tags for tags in self.tags), dtype=bool, count=len(self.tags))
+            else:
+                mask &= np.fromiter((term in name for name in self.lower_usernames), dtype=bool,
+                                    count=len(self.rows))
+        return mask
+
+    def set_filter(self, expression):
+        self.view = np.flatnonzero(self.match(expression)) if expression.strip() else np.arange(len(self.rows))
+        return self.view
+
+    def select_view(self, state=True):
+        self.selected[self.view] = state
+
+    def view_selected(self):
+        # True when every shown account is selected
+        return bool(len(self.view)) and bool(self.selected[self.view].all())
+
+    def toggle(self, index):
+        self.selected[index] = not self.selected[index]
+
+    def selected_count(self):
+        return int(self.selected[self.view].sum())
+
+    def hidden_selected_count(self):
+        # Selected earlier but filtered out now; these are not submitted
+        return int(self.selected.sum()) - self.selected_count()
+
+    def selected_rows(self):
+        # Only accounts that are both selected and shown, so a filter typed after
+        # "Select All Shown" narrows who gets the order
+        return [self.rows[i] for i in self.view[self.selected[self.view]]]
+
+class VirtualAccountList(tk.Frame):
+    # A canvas that only draws the rows in view, reusing a fixed pool of text items,
+    # so building and scrolling cost the same for 10 accounts or 10k
+    def __init__(self, master, store, **kwargs):
+        super().__init__(master, **kwargs)
+        self.store = store
+        self.top = 0
+        self.items = []
+
+        self.canvas = tk.Canvas(self, bg="white", highlightthickness=0)
+        self.scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.canvas.bind("<Configure>", self.on_resize)
+        self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.scroll(-1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.scroll(1, "units"))
+
+    def visible_rows(self):
+        return max(1, self.canvas.winfo_height() // ROW_HEIGHT)
+
+    def on_resize(self, event=None):
+        needed = self.visible_rows() + 1
+        while len(self.items) < needed:
+            y = len(self.items) * ROW_HEIGHT + ROW_HEIGHT // 2
+            self.items.append(self.canvas.create_text(6, y, anchor="w", font=("TkFixedFont", 10)))
+        self.refresh()
+
+    def refresh(self):
+        view = self.store.view
+        self.top = max(0, min(self.top, len(view) - self.visible_rows()))
+        for slot, item in enumerate(self.items):
+            position = self.top + slot
+            if position < len(view):
+                index = view[position]
+                mark = "[x]" if self.store.selected[index] else "[ ]"
+                text = f"{mark} {self.store.usernames[index]:<16} {self.store.funds[index]:>12,.2f}"
+                self.canvas.itemconfig(item, text=text)
+            else:
+                self.canvas.itemconfig(item, text="")
+        if len(view):
+            self.scrollbar.set(self.top / len(view), min(1.0, (self.top + self.visible_rows()) / len(view)))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll(self, amount, what):
+        step = self.visible_rows() if what == "pages" else 1
+        self.top += int(amount) * step
+        self.refresh()
+
+    def on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.top = int(float(args[0]) * len(self.store.view))
+            self.refresh()
+        elif action == "scroll":
+            self.scroll(args[0], args[1])
+
+    def on_click(self, event):
+        position = self.top + event.y // ROW_HEIGHT
+        if position < len(self.store.view):
+            self.store.toggle(self.store.view[position])
+            self.refresh()
+
+    def set_filter(self, expression):
+        self.store.set_filter(expression)
+        self.top = 0
+        self.refresh()
+
+    def select_view(self, state=True):
+        self.store.select_view(state)
+        self.refresh()
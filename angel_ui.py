@@ -1,13 +1,16 @@
 import tkinter as tk
-from tkinter import messagebox, simpledialog
-import csv
+from tkinter import messagebox, simpledialog, ttk
 import threading
 import pyotp
 import json
-import requests
 import hashlib
-from SmartApi import SmartConnect
+import os
 from logzero import logger, logfile
+import broker_http
+import paper_trading
+from account_list import AccountStore, VirtualAccountList
+from order_updates import OrderStateTable, OrderUpdateChannel, STREAM_READY_WAIT
+from fake_order_server import FakeOrderUpdateServer
 
 # Configure logging
 logfile("trading_log.log", maxBytes=1e6, backupCount=3)
@@ -15,6 +18,12 @@ logfile("trading_log.log", maxBytes=1e6, backupCount=3)
 # Global variables
 json_data = None
 last_json_hash = None
+# "angel" sends orders to SmartConnect, "paper" to the local paper-trading simulator
+order_backend = os.environ.get("ORDER_BACKEND", "angel")
+# Live order states for every account, fed by one update channel per backend
+order_table = OrderStateTable()
+order_channels = {}
+channel_lock = threading.Lock()
 
 def print_user_info(username, available_funds, output_text):
     logger.info(f"Username: {username}")
@@ -47,7 +56,7 @@ def fetch_symbol_token(stock_name, exchange):
     return None, None
 
 def fetch_json_data(url):
-    response = requests.get(url)
+    response = broker_http.session.get(url)
     if response.status_code == 200:
         return response.json()
     else:
@@ -72,9 +81,25 @@ def check_json_update():
         else:
             logger.info("JSON data has not been updated.")
 
+def get_order_channel():
+    with channel_lock:
+        if order_backend not in order_channels:
+            if order_backend == "paper":
+                # Paper fills are pushed through a local fake update server, same path as live
+                server = FakeOrderUpdateServer()
+                paper_trading.get_broker().listeners.append(
+                    lambda order: server.push(order['username'], paper_trading.order_data(order)))
+                order_channels[order_backend] = OrderUpdateChannel(order_table, url=server.url)
+            else:
+                order_channels[order_backend] = OrderUpdateChannel(order_table)
+        return order_channels[order_backend]
+
 def place_order(api_key, username, password, demo_token, tradingsymbol, transactiontype, producttype, exchange, available_funds, order_type, price, quantity, output_text):
     try:
-        smartApi = SmartConnect(api_key)
+        if order_backend == "paper":
+            smartApi = paper_trading.connect(api_key)
+        else:
+            smartApi = broker_http.connect(api_key)
         totp = pyotp.TOTP(demo_token).now()
         data = smartApi.generateSession(username, password, totp)
 
@@ -84,35 +109,52 @@ def place_order(api_key, username, password, demo_token, tradingsymbol, transact
 
         authToken = data['data']['jwtToken']
         refreshToken = data['data']['refreshToken']
+        feedToken = data['data'].get('feedToken')
 
-        trading_symbol, symbol_token = fetch_symbol_token(tradingsymbol, exchange)
-        if symbol_token:
-            logger.info(f"Placing order for {quantity} shares of {trading_symbol} for account {username}...")
-
-            orderparams = {
-                "variety": "NORMAL",
-                "tradingsymbol": trading_symbol,
-                "symboltoken": symbol_token,
-                "transactiontype": transactiontype,
-                "exchange": exchange.upper(),
-                "ordertype": order_type.upper(),
-                "producttype": producttype,
-                "duration": "DAY",
-                "price": str(price) if price is not None else "0",
-                "squareoff": "0",
-                "stoploss": "0",
-                "quantity": quantity
-            }
-            response = smartApi.placeOrderFullResponse(orderparams)
-            if isinstance(response, str):
-                response = json.loads(response)
-            logger.info(f"Order response: {response}")
-
-            output_text.insert(tk.END, f"Order response for {username}: {response}\n")
-
-            logout = smartApi.terminateSession('Your Client Id')
-        else:
-            logger.error("Symbol Token not found for the stock symbol.")
+        # The stream connects in the background while the symbol is looked up; the session
+        # is logged out once the orders placed through this subscription are final
+        order_channel = get_order_channel()
+        subscription = order_channel.subscribe(username, authToken, api_key, feedToken, on_close=lambda: smartApi.terminateSession(username))
+        orderid = None
+        try:
+            if order_backend == "paper":
+                trading_symbol, symbol_token = paper_trading.symbol_token(tradingsymbol, exchange)
+            else:
+                trading_symbol, symbol_token = fetch_symbol_token(tradingsymbol, exchange)
+            if symbol_token:
+                logger.info(f"Placing order for {quantity} shares of {trading_symbol} for account {username}...")
+
+                orderparams = {
+                    "variety": "NORMAL",
+                    "tradingsymbol": trading_symbol,
+                    "symboltoken": symbol_token,
+                    "transactiontype": transactiontype,
+                    "exchange": exchange.upper(),
+                    "ordertype": order_type.upper(),
+                    "producttype": producttype,
+                    "duration": "DAY",
+                    "price": str(price) if price is not None else "0",
+                    "squareoff": "0",
+                    "stoploss": "0",
+                    "quantity": quantity
+                }
+                if not subscription.ready.wait(STREAM_READY_WAIT):
+                    logger.warning(f"Order update stream for {username} not connected after {STREAM_READY_WAIT}s; placing anyway")
+                response = smartApi.placeOrderFullResponse(orderparams)
+                if isinstance(response, str):
+                    response = json.loads(response)
+                logger.info(f"Order response: {response}")
+
+                output_text.insert(tk.END, f"Order response for {username}: {response}\n")
+
+                orderid = (response.get('data') or {}).get('orderid')
+                if orderid:
+                    order_table.record_placed(username, orderid, trading_symbol, quantity)
+            else:
+                logger.error("Symbol Token not found for the stock symbol.")
+        finally:
+            # Closes the socket and logs out right away if nothing was placed or it already filled
+            order_channel.release(username, orderid)
 
     except Exception as e:
         logger.exception(f"Error placing order for {username}: {e}")
@@ -184,22 +226,35 @@ class TradingApp:
         self.accounts_frame = tk.Frame(self.right_frame, bg="lightgray")
         self.accounts_frame.pack(fill=tk.BOTH, expand=True)
 
-        self.accounts = []
+        self.filter_label = tk.Label(self.accounts_frame, text="Filter (e.g. funds>1000 group:alpha tag:swing):", bg="lightgray")
+        self.filter_label.pack(anchor="w")
+        self.filter_var = tk.StringVar()
+        self.filter_entry = tk.Entry(self.accounts_frame, textvariable=self.filter_var)
+        self.filter_entry.pack(fill=tk.X)
+        self.filter_entry.bind("<KeyRelease>", self.apply_filter)
+
         # Read data.csv file
         try:
-            with open('data.csv', newline='') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    account_var = tk.BooleanVar()
-                    account_checkbox = tk.Checkbutton(self.accounts_frame, text=row['username'], variable=account_var)
-                    account_checkbox.pack(anchor="w")
-                    self.accounts.append((row, account_var))
+            self.account_store = AccountStore.from_csv('data.csv')
         except FileNotFoundError:
+            self.account_store = AccountStore([])
             messagebox.showerror("Error", "data.csv file not found.")
 
+        self.account_list = VirtualAccountList(self.accounts_frame, self.account_store)
+        self.account_list.pack(fill=tk.BOTH, expand=True)
+
+        self.selection_label = tk.Label(self.accounts_frame, bg="lightgray")
+        self.selection_label.pack(anchor="w")
+        self.account_list.canvas.bind("<ButtonRelease-1>", self.update_selection_label, add="+")
+
         self.select_all_var = tk.BooleanVar()
-        self.select_all_checkbox = tk.Checkbutton(self.right_frame, text="Select All", variable=self.select_all_var, command=self.toggle_select_all)
+        self.select_all_checkbox = tk.Checkbutton(self.right_frame, text="Select All Shown", variable=self.select_all_var, command=self.toggle_select_all)
         self.select_all_checkbox.pack()
+        self.update_selection_label()
+
+        self.paper_var = tk.BooleanVar(value=order_backend == "paper")
+        self.paper_checkbox = tk.Checkbutton(self.right_frame, text="Paper Trading", variable=self.paper_var, command=self.toggle_paper_trading)
+        self.paper_checkbox.pack()
 
         self.output_text = tk.Text(self.right_frame, height=10, width=50)
         self.output_text.pack(fill=tk.BOTH, expand=True)
@@ -207,9 +262,35 @@ class TradingApp:
         self.submit_button = tk.Button(self.right_frame, text="Submit", command=self.submit)
         self.submit_button.pack()
 
+        self.order_status_label = tk.Label(self.right_frame, text="Order Status:", bg="lightgray")
+        self.order_status_label.pack(anchor="w")
+        columns = ("account", "orderid", "symbol", "status", "filled", "avgprice", "text")
+        self.order_status_tree = ttk.Treeview(self.right_frame, columns=columns, show="headings", height=8)
+        for column in columns:
+            self.order_status_tree.heading(column, text=column.capitalize())
+            self.order_status_tree.column(column, width=80)
+        self.order_status_tree.pack(fill=tk.BOTH, expand=True)
+
+        # Updates arrive on the channel thread; the Tk loop picks them up in batches
+        self.changed_orders = {}
+        self.changed_orders_lock = threading.Lock()
+        order_table.add_listener(self.queue_order_update)
+        self.master.after(250, self.refresh_order_status)
+
+        # Warm broker connections as soon as the user starts filling the order form
+        for entry in (self.stock_entry, self.quantity_entry, self.price_entry):
+            entry.bind("<FocusIn>", self.prewarm_connections)
+            entry.bind("<Key>", self.prewarm_connections)
+
         # Initially, hide the price entry
         self.toggle_price_entry()
 
+    def prewarm_connections(self, event=None):
+        if order_backend == "paper":
+            return
+        selected = self.account_store.selected_count()
+        broker_http.warm_async(max(selected, 1))
+
     def toggle_price_entry(self):
         if self.order_var.get() == "LIMIT":
             self.price_label.pack()
@@ -220,10 +301,46 @@ class TradingApp:
             self.price_label.pack_forget()
             self.price_entry.pack_forget()
 
+    def toggle_paper_trading(self):
+        global order_backend
+        order_backend = "paper" if self.paper_var.get() else "angel"
+        logger.info(f"Order backend: {order_backend}")
+
+    def queue_order_update(self, state):
+        with self.changed_orders_lock:
+            self.changed_orders[state['orderid']] = state
+
+    def refresh_order_status(self):
+        with self.changed_orders_lock:
+            changed, self.changed_orders = self.changed_orders, {}
+        for orderid, state in changed.items():
+            filled = f"{state.get('filledshares', 0)}/{state.get('quantity', '')}"
+            values = (state['username'], orderid, state.get('tradingsymbol', ''), state.get('orderstatus', ''),
+                      filled, state.get('averageprice', ''), state.get('text', ''))
+            if self.order_status_tree.exists(orderid):
+                self.order_status_tree.item(orderid, values=values)
+            else:
+                self.order_status_tree.insert("", 0, iid=orderid, values=values)
+        self.master.after(250, self.refresh_order_status)
+
+    def apply_filter(self, event=None):
+        self.account_list.set_filter(self.filter_var.get())
+        self.update_selection_label()
+
+    def update_selection_label(self, event=None):
+        store = self.account_store
+        text = f"{store.selected_count()} selected, {len(store.view)} of {len(store)} shown"
+        hidden = store.hidden_selected_count()
+        if hidden:
+            text += f" ({hidden} selected but hidden by the filter, not submitted)"
+        self.selection_label.config(text=text)
+        # "Select All Shown" follows row clicks and filter changes, not just its own clicks
+        self.select_all_var.set(store.view_selected())
+
     def toggle_select_all(self):
-        select_all_state = self.select_all_var.get()
-        for _, account_var in self.accounts:
-            account_var.set(select_all_state)
+        # Applies to the accounts matching the current filter only
+        self.account_list.select_view(self.select_all_var.get())
+        self.update_selection_label()
 
     def submit(self):
         stock_name = self.stock_entry.get()
@@ -243,39 +360,34 @@ class TradingApp:
             price = "0"
             self.price_entry.config(state="disabled")
 
-        # Load JSON data
-        check_json_update()
+        # Load JSON data (paper trading resolves symbols locally)
+        if order_backend != "paper":
+            check_json_update()
 
         # Clear the output text before submitting new orders
         self.output_text.delete(1.0, tk.END)
 
-        # Read data.csv file
-        try:
-            threads = []
-            for row, account_var in self.accounts:
-                if account_var.get():  # Only process selected accounts
-                    api_key = row['api_key']
-                    username = row['username']
-                    password = row['password']
-                    demo_token = row['demo_token']
-                    available_funds = float(row['available_funds'])
-
-                    # Print user info
-                    print_user_info(username, available_funds, self.output_text)
-
-                    # Create a thread for each account and start it
-                    thread = threading.Thread(target=self.place_order_for_account, args=(api_key, username, password, demo_token, stock_name, transaction_type, product_type, exchange, available_funds, order_type, price, quantity))
-                    threads.append(thread)
-                    thread.start()
-
-                    # Schedule a function to check thread status periodically
-                    self.check_thread_status(thread, username)
-
-            # Schedule a function to update GUI after a delay
-            self.master.after(1000, self.update_gui, threads)
+        threads = []
+        for row in self.account_store.selected_rows():  # Only selected accounts the filter shows
+            api_key = row['api_key']
+            username = row['username']
+            password = row['password']
+            demo_token = row['demo_token']
+            available_funds = float(row['available_funds'])
 
-        except FileNotFoundError:
-            messagebox.showerror("Error", "data.csv file not found.")
+            # Print user info
+            print_user_info(username, available_funds, self.output_text)
+
+            # Create a thread for each account and start it
+            thread = threading.Thread(target=self.place_order_for_account, args=(api_key, username, password, demo_token, stock_name, transaction_type, product_type, exchange, available_funds, order_type, price, quantity))
+            threads.append(thread)
+            thread.start()
+
+            # Schedule a function to check thread status periodically
+            self.check_thread_status(thread, username)
+
+        # Schedule a function to update GUI after a delay
+        self.master.after(1000, self.update_gui, threads)
 
     def place_order_for_account(self, api_key, username, password, demo_token, stock_name, transaction_type, product_type, exchange, available_funds, order_type, price, quantity):
         place_order(api_key, username, password, demo_token, stock_name, transaction_type, product_type, exchange, available_funds, order_type, price, quantity, self.output_text)
@@ -1,12 +1,22 @@
-from flask import Flask, render_template, request, url_for
+import os
+from flask import Flask, render_template as flask_render_template, request, url_for
 import yfinance as yf
-from prophet import Prophet
-import pandas as pd
-from prophet.plot import plot_plotly
-import json
-import plotly
+from forecast import load_history, run_forecast
+from indicators import add_indicators
+from screener import ScreenerTable, start_refresh
+from profiling import init_profiling, stage
 
 app = Flask(__name__)
+screener_table = ScreenerTable()
+
+# PROFILING=1 adds Server-Timing headers and /metrics; PROFILE_SLOW=1 also keeps
+# cProfile dumps of the slowest requests per route in profiles/
+if os.environ.get('PROFILING') == '1':
+    init_profiling(app, sample_slow=os.environ.get('PROFILE_SLOW') == '1')
+
+def render_template(*args, **kwargs):
+    with stage('render'):
+        return flask_render_template(*args, **kwargs)
 
 # Home page
 @app.route('/')
@@ -18,8 +28,13 @@ def index():
 def real_time():
     if request.method == 'POST':
         symbol = request.form['symbol']
-        data = yf.download(symbol, period='1d', interval='5m')
-        return render_template('real_time.html', symbol=symbol, data=data.to_html())
+        with stage('yf_download'):
+            data = yf.download(symbol, period='1d', interval='5m')
+        with stage('indicators'):
+            data = add_indicators(data)
+        with stage('to_html'):
+            table = data.to_html()
+        return render_template('real_time.html', symbol=symbol, data=table)
     else:
         return render_template('real_time.html')
 
@@ -29,33 +44,37 @@ def prediction():
     if request.method == 'POST':
         symbol = request.form['symbol']
         period = int(request.form['period'])
-        data = yf.download(symbol, period='5y')['Close']
-        current_price = data.iloc[-1]  # Last available stock price
-        df = pd.DataFrame(data).reset_index()
-        df.columns = ['ds', 'y']
-
-        model = Prophet()
-        model.fit(df)
-        future = model.make_future_dataframe(periods=period)
-        forecast = model.predict(future)
-        predicted_price = forecast.iloc[-1]['yhat']  # Last predicted price
-
-        fig = plot_plotly(model, forecast)
-        graph_json = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
-
-        # Calculate profit or loss percentage
-        percentage_change = ((predicted_price - current_price) / current_price) * 100
-
-        # Determine recommendation based on predicted price
-        if predicted_price > current_price:
-            recommendation = 'Buy'
-        else:
-            recommendation = 'Sell'
-
-        return render_template('prediction.html', plot=graph_json, recommendation=recommendation,
-                               percentage_change=percentage_change, current_price=current_price)
+        fast = request.form.get('fast') == 'on'
+        samples = request.form.get('uncertainty_samples')
+        uncertainty_samples = int(samples) if samples else None
+
+        df = load_history(symbol, period='5y')
+        result = run_forecast(df, period, fast=fast, uncertainty_samples=uncertainty_samples)
+
+        return render_template('prediction.html', plot=result['plot'], recommendation=result['recommendation'],
+                               percentage_change=result['percentage_change'], current_price=result['current_price'])
     else:
         return render_template('prediction.html')
 
+# Precomputed universe rankings
+@app.route('/screener')
+def screener():
+    args = request.args
+    results = screener_table.query(
+        sort=args.get('sort', 'expected_change'),
+        ascending=args.get('order') == 'asc',
+        recommendation=args.get('recommendation'),
+        min_change=args.get('min_change', type=float),
+        max_change=args.get('max_change', type=float),
+        max_band=args.get('max_band', type=float),
+        search=args.get('q'),
+        limit=args.get('limit', 100, type=int),
+    )
+    return render_template('screener.html', rows=results.to_dict('records'), args=args)
+
 if __name__ == '__main__':
+    # Refresh the screener table in the background (only in the reloader child)
+    refresh_hours = float(os.environ.get('SCREENER_REFRESH_HOURS', '6'))
+    if refresh_hours > 0 and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_refresh(refresh_hours)
     app.run(debug=True)
\ No newline at end of file
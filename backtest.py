@@ -0,0 +1,134 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from forecast import load_history, fit_model
+
+CACHE_DIR = 'backtest_cache'
+TICKERS_FILE = 'StockStreamTickersData.csv'
+SUMMARY_COLUMNS = ['symbol', 'signals', 'trades', 'buys', 'hit_rate', 'total_pnl', 'mean_pnl', 'last_date', 'error']
+
+def load_tickers(path=TICKERS_FILE):
+    return pd.read_csv(path, encoding='utf-8-sig')['Symbol'].dropna().tolist()
+
+def cache_path(symbol, horizon, refit_every, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f"{symbol}_h{horizon}_r{refit_every}.csv")
+
+def walk_forward(history, start, horizon=30, refit_every=20):
+    # Refit on data up to each block start, then reuse that model for the block,
+    # so no prediction ever sees prices after the date it is made on
+    rows = []
+    for block_start in range(start, len(history), refit_every):
+        block = history.iloc[block_start:block_start + refit_every]
+        model = fit_model(history.iloc[:block_start + 1], uncertainty_samples=0)
+        targets = pd.DataFrame({'ds': block['ds'] + pd.Timedelta(days=horizon)})
+        predicted = model.predict(targets)['yhat'].to_numpy()
+        rows.append(pd.DataFrame({
+            'ds': block['ds'].to_numpy(),
+            'close': block['y'].to_numpy(),
+            'predicted': predicted,
+            'recommendation': np.where(predicted > block['y'].to_numpy(), 'Buy', 'Sell'),
+        }))
+    return pd.concat(rows, ignore_index=True) if rows else None
+
+def resolve_outcomes(results, history, horizon=30):
+    # Fill in the realised close for rows whose horizon has now passed
+    pending = results['future_close'].isna()
+    target = results.loc[pending, 'ds'] + pd.Timedelta(days=horizon)
+    pos = history['ds'].searchsorted(target)
+    known = pos < len(history)
+    idx = target.index[known]
+    results.loc[idx, 'future_close'] = history['y'].to_numpy()[pos[known]]
+
+    returns = results['future_close'] / results['close'] - 1
+    side = np.where(results['recommendation'] == 'Buy', 1, -1)
+    results['hit'] = (returns * side > 0).where(results['future_close'].notna())
+    results['pnl'] = returns * side
+    return results
+
+def summarize(symbol, results):
+    resolved = results.dropna(subset=['future_close'])
+    return {
+        'symbol': symbol,
+        'signals': len(results),
+        'trades': len(resolved),
+        'buys': int((resolved['recommendation'] == 'Buy').sum()),
+        'hit_rate': resolved['hit'].astype(float).mean() if len(resolved) else np.nan,
+        'total_pnl': resolved['pnl'].sum(),
+        'mean_pnl': resolved['pnl'].mean() if len(resolved) else np.nan,
+        'last_date': results['ds'].max() if len(results) else None,
+        'error': None,
+    }
+
+def backtest_ticker(symbol, horizon=30, refit_every=20, min_train=252, period='5y', cache_dir=CACHE_DIR):
+    history = load_history(symbol, period=period)
+    history['ds'] = pd.to_datetime(history['ds']).dt.tz_localize(None)
+    history = history.dropna().reset_index(drop=True)
+
+    path = cache_path(symbol, horizon, refit_every, cache_dir)
+    start = min_train
+    cached = None
+    if os.path.exists(path):
+        cached = pd.read_csv(path, parse_dates=['ds'])
+        if len(cached):
+            # Only dates after the cached run need new predictions
+            start = max(start, int(history['ds'].searchsorted(cached['ds'].max(), side='right')))
+
+    new = walk_forward(history, start, horizon, refit_every)
+    if new is None and cached is None:
+        # Fewer than min_train bars and nothing cached: no signal can be made yet
+        return {'symbol': symbol, 'signals': 0, 'trades': 0, 'buys': 0,
+                'error': f"insufficient history ({len(history)} bars, need {min_train})"}
+    if new is not None:
+        new['future_close'] = np.nan
+    results = pd.concat([df for df in (cached, new) if df is not None], ignore_index=True)
+    results = resolve_outcomes(results, history, horizon)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    results.to_csv(path, index=False)
+    return summarize(symbol, results)
+
+def _backtest_safe(symbol, **kwargs):
+    try:
+        return backtest_ticker(symbol, **kwargs)
+    except Exception as e:
+        return {'symbol': symbol, 'error': str(e)}
+
+def run_universe(symbols, workers=None, **kwargs):
+    summaries = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_backtest_safe, symbol, **kwargs) for symbol in symbols]
+        for future in as_completed(futures):
+            summary = future.result()
+            print(f"{summary['symbol']}: hit rate {summary.get('hit_rate')}, error {summary.get('error')}")
+            summaries.append(summary)
+    # Fixed columns, so a run where every ticker failed still has hit_rate and trades
+    return pd.DataFrame(summaries, columns=SUMMARY_COLUMNS).sort_values('symbol', ignore_index=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the Buy/Sell forecast rule")
+    parser.add_argument('--symbols', nargs='*', help="Defaults to every ticker in StockStreamTickersData.csv")
+    parser.add_argument('--limit', type=int, help="Only test the first N tickers")
+    parser.add_argument('--horizon', type=int, default=30, help="Forecast horizon in days")
+    parser.add_argument('--refit-every', type=int, default=20, help="Bars between model refits")
+    parser.add_argument('--min-train', type=int, default=252, help="Bars of history before the first signal")
+    parser.add_argument('--period', default='5y')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--output', default='backtest_summary.csv')
+    args = parser.parse_args()
+
+    symbols = args.symbols or load_tickers()
+    if args.limit:
+        symbols = symbols[:args.limit]
+    summary = run_universe(symbols, workers=args.workers, horizon=args.horizon, refit_every=args.refit_every,
+                           min_train=args.min_train, period=args.period)
+    summary.to_csv(args.output, index=False)
+
+    resolved = summary.dropna(subset=['hit_rate'])
+    if len(resolved):
+        overall = (resolved['hit_rate'] * resolved['trades']).sum() / resolved['trades'].sum()
+        print(f"Overall hit rate: {overall:.2%} over {int(resolved['trades'].sum())} trades")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from forecast import load_history, run_forecast
+
+def synthetic_history(days=5 * 252, seed=0):
+    # Random-walk closes on business days, roughly the size of a 5y download
+    rng = np.random.default_rng(seed)
+    ds = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+    y = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+    return pd.DataFrame({'ds': ds, 'y': y})
+
+def time_call(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark full vs fast forecast paths")
+    parser.add_argument('--symbol', help="Download history with yfinance instead of synthetic data")
+    parser.add_argument('--period', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = load_history(args.symbol) if args.symbol else synthetic_history()
+    print(f"History rows: {len(df)}, horizon: {args.period} days")
+
+    cases = [
+        ('full (1000 samples, history, plot)', dict()),
+        ('fast, 100 samples, no plot', dict(fast=True, uncertainty_samples=100)),
+        ('fast, no samples, no plot', dict(fast=True)),
+    ]
+    baseline = None
+    for name, kwargs in cases:
+        elapsed, result = time_call(lambda: run_forecast(df, args.period, **kwargs), args.repeat)
+        baseline = baseline or elapsed
+        print(f"{name:<40} {elapsed:8.3f}s  x{baseline / elapsed:5.1f}  "
+              f"yhat={result['predicted_price']:.4f} {result['recommendation']}")
+
+if __name__ == '__main__':
+    main()
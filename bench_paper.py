@@ -0,0 +1,98 @@
+import argparse
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from paper_trading import PaperBroker, PaperSmartConnect, PriceReplay, bars_path
+
+def build_broker(accounts, symbols, funds):
+    paper_broker = PaperBroker()
+    for i in range(accounts):
+        paper_broker.add_account(f"ACC{i}", "pw", f"key{i}", funds)
+    for i in range(symbols):
+        paper_broker.prices[f"SYM{i}"] = 100.0
+    return paper_broker
+
+def attach_replay(paper_broker, symbols, bars, bars_dir):
+    # Random-walk bar files, so prices come from the replay path orders use in the app
+    rng = random.Random(0)
+    for i in range(symbols):
+        price = 100.0
+        with open(bars_path(f"SYM{i}", bars_dir), 'w') as f:
+            f.write("time,close\n")
+            for t in range(bars):
+                f.write(f"{t},{price:.2f}\n")
+                price = max(1.0, price * (1 + rng.gauss(0, 0.01)))
+        del paper_broker.prices[f"SYM{i}"]
+    paper_broker.feed = PriceReplay(paper_broker, interval=0, bars_dir=bars_dir)
+
+def blast(paper_broker, usernames, orders_per_account, symbols, limit_ratio):
+    # One session per account, like place_order, then a burst of mixed orders
+    rng = random.Random()
+    for username in usernames:
+        smartApi = PaperSmartConnect(f"key{username[3:]}", paper_broker)
+        smartApi.generateSession(username, "pw", "000000")
+        for _ in range(orders_per_account):
+            is_limit = rng.random() < limit_ratio
+            smartApi.placeOrderFullResponse({
+                "variety": "NORMAL",
+                "tradingsymbol": f"SYM{rng.randrange(symbols)}-EQ",
+                "symboltoken": "0",
+                "transactiontype": rng.choice(["BUY", "SELL"]),
+                "exchange": "NSE",
+                "ordertype": "LIMIT" if is_limit else "MARKET",
+                "producttype": "INTRADAY",
+                "duration": "DAY",
+                "price": str(round(rng.uniform(95, 105), 2)) if is_limit else "0",
+                "squareoff": "0",
+                "stoploss": "0",
+                "quantity": rng.randint(1, 10),
+            })
+        smartApi.terminateSession(username)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the paper-trading backend with a multi-account blast")
+    parser.add_argument('--accounts', type=int, default=1000)
+    parser.add_argument('--orders-per-account', type=int, default=20)
+    parser.add_argument('--symbols', type=int, default=50)
+    parser.add_argument('--limit-ratio', type=float, default=0.5)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--replay-bars', type=int, default=0,
+                        help="Price symbols from N stored bars through PriceReplay instead of fixed prices")
+    args = parser.parse_args()
+
+    paper_broker = build_broker(args.accounts, args.symbols, 1e7)
+    bars_dir = tempfile.mkdtemp() if args.replay_bars else None
+    if args.replay_bars:
+        attach_replay(paper_broker, args.symbols, args.replay_bars, bars_dir)
+    usernames = list(paper_broker.accounts)
+    chunks = [usernames[i::args.threads] for i in range(args.threads)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        futures = [executor.submit(blast, paper_broker, chunk, args.orders_per_account, args.symbols, args.limit_ratio)
+                   for chunk in chunks]
+        for future in futures:
+            future.result()
+    placed = time.perf_counter() - start
+
+    # Move every price through the resting limit orders
+    start = time.perf_counter()
+    if args.replay_bars:
+        for _ in range(args.replay_bars):
+            paper_broker.feed.step()
+    else:
+        for i in range(args.symbols):
+            paper_broker.update_price(f"SYM{i}", 94.0)
+            paper_broker.update_price(f"SYM{i}", 106.0)
+    matched = time.perf_counter() - start
+
+    statuses = {}
+    for order in paper_broker.orders.values():
+        statuses[order['status']] = statuses.get(order['status'], 0) + 1
+    total = len(paper_broker.orders)
+    print(f"Placed {total} orders from {args.accounts} accounts in {placed:.3f}s ({total / placed:,.0f} orders/s)")
+    print(f"Matched resting orders in {matched:.3f}s; statuses: {statuses}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from logzero import logger
+import SmartApi.smartConnect as smart_connect_module
+from SmartApi import SmartConnect
+
+API_ROOT = SmartConnect._rootUrl
+POOL_SIZE = 32           # Max keep-alive connections kept open per host
+WARM_TIMEOUT = 5         # Seconds allowed for a warm-up request
+WARM_INTERVAL = 30       # Don't re-warm more often than this; idle connections stay open longer
+
+def _build_session():
+    session = requests.Session()
+    # Only connection failures are retried: the request was never sent, so an order
+    # can't be duplicated. Read timeouts are surfaced to the caller as before.
+    retries = Retry(total=2, connect=2, read=0, status=0, other=0, backoff_factor=0.2)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=retries)
+    session.mount("https://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+    return session
+
+session = _build_session()
+
+class _SharedRequests:
+    # Stands in for the `requests` module inside SmartApi so every SmartConnect
+    # instance sends through the shared session instead of opening fresh connections
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+    def request(self, method, url, **kwargs):
+        return session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return session.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return session.post(url, **kwargs)
+
+smart_connect_module.requests = _SharedRequests()
+
+def connect(api_key):
+    smartApi = SmartConnect(api_key)
+    # Older SDK versions send through reqsession rather than the module-level requests
+    smartApi.reqsession = session
+    return smartApi
+
+_warm_lock = threading.Lock()
+_last_warm = 0.0
+_warm_count = 0
+
+def _open_connection():
+    try:
+        session.head(API_ROOT, timeout=WARM_TIMEOUT).close()
+    except requests.RequestException as e:
+        logger.warning(f"Connection warm-up to {API_ROOT} failed: {e}")
+
+def warm(count=1):
+    # Open `count` connections in parallel so concurrent orders each find a warm one
+    global _last_warm, _warm_count
+    count = max(1, min(count, POOL_SIZE))
+    with _warm_lock:
+        if time.monotonic() - _last_warm < WARM_INTERVAL and count <= _warm_count:
+            return []
+        _last_warm = time.monotonic()
+        _warm_count = count
+    threads = [threading.Thread(target=_open_connection, daemon=True) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+def warm_async(count=1):
+    threading.Thread(target=warm, args=(count,), daemon=True).start()
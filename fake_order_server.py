@@ -0,0 +1,157 @@
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+from logzero import logger
+
+# Minimal stand-in for Angel's order-update WebSocket endpoint: accepts connections,
+# answers "ping" with "pong" and pushes orderData frames to a client code's sockets.
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+def _encode_frame(payload, opcode=0x1):
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 1 << 16:
+        header += bytes([126]) + struct.pack("!H", length)
+    else:
+        header += bytes([127]) + struct.pack("!Q", length)
+    return header + payload
+
+def _recv_exact(conn, size):
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("client disconnected")
+        data += chunk
+    return data
+
+def _read_frame(conn):
+    first, second = _recv_exact(conn, 2)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", _recv_exact(conn, 2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", _recv_exact(conn, 8))[0]
+    mask = _recv_exact(conn, 4) if second & 0x80 else b"\0\0\0\0"
+    payload = bytes(b ^ mask[i % 4] for i, b in enumerate(_recv_exact(conn, length)))
+    return opcode, payload
+
+class FakeOrderUpdateServer:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen(128)
+        self.host, self.port = self.server.getsockname()
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()
+        self.clients = {}
+        self.running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/smart-order-update"
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _handshake(self, conn):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = conn.recv(4096)
+            if not chunk:
+                raise ConnectionError("client disconnected during handshake")
+            request += chunk
+        headers = {}
+        for line in request.decode("latin-1").split("\r\n")[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WEBSOCKET_GUID).encode()).digest())
+        return headers.get("x-client-code", ""), accept
+
+    def _serve(self, conn):
+        client_code = None
+        try:
+            client_code, accept = self._handshake(conn)
+            # Registered before the 101 goes out, so pushes right after connect aren't lost
+            with self.lock:
+                self.clients.setdefault(client_code, []).append(conn)
+            conn.sendall(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                         b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+            # Same first frame the real endpoint sends after connecting
+            self._send(conn, json.dumps({"user-id": client_code, "status-code": "200", "order-status": "AB00",
+                                         "error-message": "", "orderData": None}))
+            while self.running:
+                opcode, payload = _read_frame(conn)
+                if opcode == 0x8:
+                    self._send(conn, payload, opcode=0x8)
+                    break
+                if opcode == 0x9:
+                    self._send(conn, payload, opcode=0xA)
+                elif opcode == 0x1 and payload == b"ping":
+                    self._send(conn, "pong")
+        except (ConnectionError, OSError, KeyError) as e:
+            logger.debug(f"Fake order update client {client_code} closed: {e}")
+        finally:
+            with self.lock:
+                if conn in self.clients.get(client_code, []):
+                    self.clients[client_code].remove(conn)
+            conn.close()
+
+    def _send(self, conn, message, opcode=0x1):
+        payload = message.encode() if isinstance(message, str) else message
+        with self.send_lock:
+            conn.sendall(_encode_frame(payload, opcode))
+
+    def push(self, client_code, order):
+        # Send an order update to every socket open for client_code; returns how many got it
+        message = json.dumps({"user-id": client_code, "status-code": "200", "order-status": "AB05",
+                              "error-message": "", "orderData": order})
+        with self.lock:
+            conns = list(self.clients.get(client_code, []))
+        sent = 0
+        for conn in conns:
+            try:
+                self._send(conn, message)
+                sent += 1
+            except OSError:
+                pass
+        return sent
+
+    def ping(self, client_code, payload=b""):
+        # Server-initiated control ping, as the real endpoint may send between updates
+        with self.lock:
+            conns = list(self.clients.get(client_code, []))
+        for conn in conns:
+            self._send(conn, payload, opcode=0x9)
+        return len(conns)
+
+    def connected(self, client_code):
+        with self.lock:
+            return len(self.clients.get(client_code, []))
+
+    def close(self):
+        self.running = False
+        self.server.close()
+        with self.lock:
+            conns = [conn for conns in self.clients.values() for conn in conns]
+        for conn in conns:
+            # shutdown() wakes the serving thread's recv() and sends the FIN; close() alone doesn't
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+                conn.close()
+            except OSError:
+                pass
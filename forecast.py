@@ -0,0 +1,69 @@
+import json
+import pandas as pd
+import plotly
+import yfinance as yf
+from prophet import Prophet
+from prophet.plot import plot_plotly
+from profiling import stage
+
+# Prophet's own default; used when the caller wants the full plot with bands
+DEFAULT_UNCERTAINTY_SAMPLES = 1000
+
+def load_history(symbol, period='5y'):
+    with stage('yf_download'):
+        data = yf.download(symbol, period=period)['Close']
+    if isinstance(data, pd.DataFrame):
+        data = data.iloc[:, 0]
+    df = pd.DataFrame(data).reset_index()
+    df.columns = ['ds', 'y']
+    return df
+
+def fit_model(df, uncertainty_samples=DEFAULT_UNCERTAINTY_SAMPLES):
+    # uncertainty_samples=0 disables the simulated bands entirely
+    model = Prophet(uncertainty_samples=uncertainty_samples)
+    with stage('prophet_fit'):
+        model.fit(df)
+    return model
+
+def predict(model, periods, fast=False):
+    # In fast mode only the horizon rows are predicted, not the ~5 years of history.
+    # With no horizon there would be no rows at all, so keep the history as the full path does.
+    future = model.make_future_dataframe(periods=periods, include_history=not fast or periods < 1)
+    with stage('predict'):
+        return model.predict(future)
+
+def recommend(current_price, predicted_price):
+    percentage_change = ((predicted_price - current_price) / current_price) * 100
+    recommendation = 'Buy' if predicted_price > current_price else 'Sell'
+    return recommendation, percentage_change
+
+def plot_json(model, forecast):
+    with stage('plot_plotly'):
+        fig = plot_plotly(model, forecast)
+    with stage('json_encode'):
+        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+
+def run_forecast(df, periods, fast=False, uncertainty_samples=None, with_plot=None):
+    if uncertainty_samples is None:
+        uncertainty_samples = 0 if fast else DEFAULT_UNCERTAINTY_SAMPLES
+    if with_plot is None:
+        with_plot = not fast
+
+    current_price = float(df['y'].iloc[-1])  # Last available stock price
+    model = fit_model(df, uncertainty_samples=uncertainty_samples)
+    # The plot needs the fitted history, so it always gets the full frame
+    forecast = predict(model, periods, fast=fast and not with_plot)
+    last = forecast.iloc[-1]
+    predicted_price = float(last['yhat'])  # Last predicted price
+    recommendation, percentage_change = recommend(current_price, predicted_price)
+
+    result = {
+        'current_price': current_price,
+        'predicted_price': predicted_price,
+        'percentage_change': percentage_change,
+        'recommendation': recommendation,
+        'yhat_lower': float(last['yhat_lower']) if 'yhat_lower' in forecast else None,
+        'yhat_upper': float(last['yhat_upper']) if 'yhat_upper' in forecast else None,
+        'plot': plot_json(model, forecast) if with_plot else None,
+    }
+    return result
@@ -0,0 +1,233 @@
+import numpy as np
+import pandas as pd
+
+# All batch functions take arrays shaped (bars, tickers) -- a 1-D series is treated
+# as a single ticker -- and return arrays of the same shape, NaN during warm-up.
+# IndicatorStream runs the same recurrences one bar at a time, so both agree.
+
+def _panel(values):
+    values = np.asarray(values, dtype=float)
+    return values.reshape(-1, 1) if values.ndim == 1 else values
+
+def _shape_like(result, values):
+    return result.ravel() if np.ndim(values) == 1 else result
+
+def _recursive(values, alpha):
+    # y[t] = y[t-1] + alpha * (x[t] - y[t-1]), seeded with the first bar,
+    # looping over time but vectorised across tickers
+    out = np.empty_like(values)
+    if len(values) == 0:
+        return out
+    out[0] = values[0]
+    for t in range(1, len(values)):
+        out[t] = out[t - 1] + alpha * (values[t] - out[t - 1])
+    return out
+
+def _rolling_sum(values, window):
+    out = np.full_like(values, np.nan)
+    if len(values) >= window:
+        csum = np.cumsum(values, axis=0)
+        out[window - 1] = csum[window - 1]
+        out[window:] = csum[window:] - csum[:-window]
+    return out
+
+def sma(close, window=20):
+    values = _panel(close)
+    return _shape_like(_rolling_sum(values, window) / window, close)
+
+def ema(close, span=20):
+    values = _panel(close)
+    return _shape_like(_recursive(values, 2.0 / (span + 1)), close)
+
+def rsi(close, period=14):
+    values = _panel(close)
+    delta = np.diff(values, axis=0, prepend=values[:1])
+    avg_gain = _recursive(np.clip(delta, 0, None), 1.0 / period)
+    avg_loss = _recursive(np.clip(-delta, 0, None), 1.0 / period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = 100 - 100 / (1 + avg_gain / avg_loss)
+    result = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), result)
+    result[:period] = np.nan
+    return _shape_like(result, close)
+
+def macd(close, fast=12, slow=26, signal=9):
+    values = _panel(close)
+    line = _recursive(values, 2.0 / (fast + 1)) - _recursive(values, 2.0 / (slow + 1))
+    signal_line = _recursive(line, 2.0 / (signal + 1))
+    return (_shape_like(line, close), _shape_like(signal_line, close),
+            _shape_like(line - signal_line, close))
+
+def bollinger(close, window=20, num_std=2.0):
+    values = _panel(close)
+    mean = _rolling_sum(values, window) / window
+    var = _rolling_sum(values ** 2, window) / window - mean ** 2
+    std = np.sqrt(np.clip(var, 0, None))
+    return (_shape_like(mean + num_std * std, close), _shape_like(mean, close),
+            _shape_like(mean - num_std * std, close))
+
+def true_range(high, low, close):
+    high, low, close = _panel(high), _panel(low), _panel(close)
+    prev_close = np.vstack([close[:1], close[:-1]])
+    tr = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+    tr[0] = high[0] - low[0]
+    return tr
+
+def atr(high, low, close, period=14):
+    result = _recursive(true_range(high, low, close), 1.0 / period)
+    result[:period - 1] = np.nan
+    return _shape_like(result, close)
+
+def vwap(high, low, close, volume):
+    high, low, volume_ = _panel(high), _panel(low), _panel(volume)
+    typical = (high + low + _panel(close)) / 3
+    cum_volume = np.cumsum(volume_, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.cumsum(typical * volume_, axis=0) / cum_volume
+    result[cum_volume == 0] = np.nan
+    return _shape_like(result, close)
+
+INDICATORS = ['SMA', 'EMA', 'RSI', 'MACD', 'MACD_Signal', 'MACD_Hist', 'BB_Upper', 'BB_Mid', 'BB_Lower',
+              'ATR', 'VWAP']
+
+def compute_indicators(high, low, close, volume, window=20, period=14):
+    # A missing bar would carry NaN through every later cumsum and recurrence, so a ticker
+    # with gaps is computed over its own bars only and the gaps stay NaN in the output
+    inputs = [_panel(v) for v in (high, low, close, volume)]
+    missing = np.any([np.isnan(v) for v in inputs], axis=0)
+    if not missing.any():
+        return _compute_panel(high, low, close, volume, window, period)
+    results = {name: np.full(missing.shape, np.nan) for name in INDICATORS}
+    gapless = ~missing.any(axis=0)
+    groups = [(np.ones(len(missing), dtype=bool), np.flatnonzero(gapless))]
+    groups += [(~missing[:, i], [i]) for i in np.flatnonzero(~gapless)]
+    for rows, cols in groups:
+        if len(cols) and rows.any():
+            part = _compute_panel(*(v[rows][:, cols] for v in inputs), window, period)
+            for name, values in part.items():
+                results[name][np.ix_(rows, cols)] = values
+    return {name: _shape_like(values, close) for name, values in results.items()}
+
+def _compute_panel(high, low, close, volume, window, period):
+    macd_line, macd_signal, macd_hist = macd(close)
+    bb_upper, bb_mid, bb_lower = bollinger(close, window)
+    return {
+        'SMA': sma(close, window),
+        'EMA': ema(close, window),
+        'RSI': rsi(close, period),
+        'MACD': macd_line,
+        'MACD_Signal': macd_signal,
+        'MACD_Hist': macd_hist,
+        'BB_Upper': bb_upper,
+        'BB_Mid': bb_mid,
+        'BB_Lower': bb_lower,
+        'ATR': atr(high, low, close, period),
+        'VWAP': vwap(high, low, close, volume),
+    }
+
+def add_indicators(df, window=20, period=14):
+    # Works on a single-ticker OHLCV frame or a yf.download (field, ticker) panel
+    if df.empty:
+        return df
+    indicators = compute_indicators(df['High'].to_numpy(), df['Low'].to_numpy(),
+                                    df['Close'].to_numpy(), df['Volume'].to_numpy(),
+                                    window=window, period=period)
+    out = df.copy()
+    tickers = df['Close'].columns if isinstance(df['Close'], pd.DataFrame) else None
+    for name, values in indicators.items():
+        if tickers is None:
+            out[name] = values
+        else:
+            for i, ticker in enumerate(tickers):
+                out[(name, ticker)] = values[:, i]
+    return out
+
+class IndicatorStream:
+    # O(1) per bar: running sums over ring buffers for the windowed indicators
+    # and the same recursive smoothing as the batch functions for the rest.
+    def __init__(self, n_tickers=1, window=20, period=14, fast=12, slow=26, signal=9, num_std=2.0):
+        self.n_tickers = n_tickers
+        self.window = window
+        self.period = period
+        self.num_std = num_std
+        self.alpha_ema = 2.0 / (window + 1)
+        self.alpha_fast = 2.0 / (fast + 1)
+        self.alpha_slow = 2.0 / (slow + 1)
+        self.alpha_signal = 2.0 / (signal + 1)
+        self.alpha_wilder = 1.0 / period
+        self.reset()
+
+    def reset(self):
+        n = self.n_tickers
+        self.count = 0
+        self.buffer = np.zeros((self.window, n))
+        self.sum = np.zeros(n)
+        self.sum_sq = np.zeros(n)
+        self.prev_close = None
+        self.ema = self.ema_fast = self.ema_slow = self.signal = None
+        self.avg_gain = self.avg_loss = self.atr = None
+        self.reset_vwap()
+
+    def reset_vwap(self):
+        # Call at the start of each session
+        self.cum_pv = np.zeros(self.n_tickers)
+        self.cum_volume = np.zeros(self.n_tickers)
+
+    def update(self, high, low, close, volume):
+        high, low, close, volume = (np.broadcast_to(np.asarray(v, dtype=float), (self.n_tickers,))
+                                    for v in (high, low, close, volume))
+
+        slot = self.count % self.window
+        if self.count >= self.window:
+            old = self.buffer[slot]
+            self.sum -= old
+            self.sum_sq -= old ** 2
+        self.buffer[slot] = close
+        self.sum += close
+        self.sum_sq += close ** 2
+
+        if self.prev_close is None:
+            tr = high - low
+            self.ema, self.ema_fast, self.ema_slow = close.copy(), close.copy(), close.copy()
+            self.signal = np.zeros(self.n_tickers)
+            self.avg_gain, self.avg_loss, self.atr = np.zeros(self.n_tickers), np.zeros(self.n_tickers), tr
+        else:
+            delta = close - self.prev_close
+            tr = np.maximum(high - low, np.maximum(np.abs(high - self.prev_close), np.abs(low - self.prev_close)))
+            self.ema = self.ema + self.alpha_ema * (close - self.ema)
+            self.ema_fast = self.ema_fast + self.alpha_fast * (close - self.ema_fast)
+            self.ema_slow = self.ema_slow + self.alpha_slow * (close - self.ema_slow)
+            line = self.ema_fast - self.ema_slow
+            self.signal = self.signal + self.alpha_signal * (line - self.signal)
+            self.avg_gain = self.avg_gain + self.alpha_wilder * (np.clip(delta, 0, None) - self.avg_gain)
+            self.avg_loss = self.avg_loss + self.alpha_wilder * (np.clip(-delta, 0, None) - self.avg_loss)
+            self.atr = self.atr + self.alpha_wilder * (tr - self.atr)
+        self.prev_close = close.copy()
+        self.count += 1
+
+        self.cum_pv += (high + low + close) / 3 * volume
+        self.cum_volume += volume
+        return self.values()
+
+    def values(self):
+        nan = np.full(self.n_tickers, np.nan)
+        full = self.count >= self.window
+        mean = self.sum / self.window if full else nan
+        std = np.sqrt(np.clip(self.sum_sq / self.window - mean ** 2, 0, None)) if full else nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi_value = 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+            vwap_value = np.where(self.cum_volume > 0, self.cum_pv / self.cum_volume, np.nan)
+        rsi_value = np.where(self.avg_loss == 0, np.where(self.avg_gain == 0, 50.0, 100.0), rsi_value)
+        line = self.ema_fast - self.ema_slow
+        return {
+            'SMA': mean,
+            'EMA': self.ema,
+            'RSI': rsi_value if self.count > self.period else nan,
+            'MACD': line,
+            'MACD_Signal': self.signal,
+            'MACD_Hist': line - self.signal,
+            'BB_Upper': mean + self.num_std * std,
+            'BB_Mid': mean,
+            'BB_Lower': mean - self.num_std * std,
+            'ATR': self.atr if self.count >= self.period else nan,
+            'VWAP': vwap_value,
+        }
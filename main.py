@@ -5,21 +5,38 @@ from sklearn.preprocessing import MinMaxScaler
 from keras.models import Sequential
 from keras.layers import LSTM, Dense
 import matplotlib.pyplot as plt
+from indicators import compute_indicators, IndicatorStream
+from model_store import get_model
 
 def fetch_data(stock_name, start_date='2010-01-01', end_date='2023-01-01'):
     data = yf.download(stock_name, start=start_date, end=end_date)
     return data['Close'].values.reshape(-1, 1)  # We use only the closing prices
 
-def prepare_data(data, n_steps=50):
-    scaler = MinMaxScaler(feature_range=(0, 1))
-    data_scaled = scaler.fit_transform(data)
+def fetch_ohlcv(stock_name, start_date='2010-01-01', end_date='2023-01-01'):
+    data = yf.download(stock_name, start=start_date, end=end_date)
+    # yf.download may return (field, ticker) columns even for a single ticker
+    return {name: data[name].values.reshape(len(data), -1)[:, 0] for name in ['High', 'Low', 'Close', 'Volume']}
+
+def feature_matrix(ohlcv, features):
+    # Close stays in column 0 since it is the prediction target
+    indicators = compute_indicators(ohlcv['High'], ohlcv['Low'], ohlcv['Close'], ohlcv['Volume'])
+    data = np.column_stack([ohlcv['Close']] + [indicators[name] for name in features])
+    return data[~np.isnan(data).any(axis=1)]  # Drop the indicator warm-up rows
+
+def prepare_data(data, n_steps=50, scaler=None):
+    # Pass a fitted scaler to reuse it, e.g. when fine-tuning a saved model
+    if scaler is None:
+        scaler = MinMaxScaler(feature_range=(0, 1))
+        data_scaled = scaler.fit_transform(data)
+    else:
+        data_scaled = scaler.transform(data)
     
     X, y = [], []
     for i in range(n_steps, len(data_scaled)):
-        X.append(data_scaled[i-n_steps:i, 0])
+        X.append(data_scaled[i-n_steps:i, :])
         y.append(data_scaled[i, 0])
     X, y = np.array(X), np.array(y)
-    X = np.reshape(X, (X.shape[0], X.shape[1], 1))
+    X = np.reshape(X, (X.shape[0], X.shape[1], data_scaled.shape[1]))
     return X, y, scaler
 
 def build_model(input_shape):
@@ -32,29 +49,45 @@ def build_model(input_shape):
     model.compile(optimizer='adam', loss='mean_squared_error')
     return model
 
-def predict_future_prices(model, data, scaler, future_months=3, steps_per_month=20):
-    test_inputs = data[-50:].reshape(-1, 1)
-    test_inputs = scaler.transform(test_inputs)
+def predict_future_prices(model, data, scaler, future_months=3, steps_per_month=20, ohlcv=None, features=None):
+    n_features = data.shape[1]
+    test_inputs = scaler.transform(data[-50:].reshape(-1, n_features))
+
+    # Replay the history once so each predicted bar only costs an O(1) indicator update
+    stream = None
+    if features:
+        stream = IndicatorStream()
+        for bar in zip(ohlcv['High'], ohlcv['Low'], ohlcv['Close'], ohlcv['Volume']):
+            stream.update(*bar)
+        last_volume = ohlcv['Volume'][-1]
 
     predictions = []
     for _ in range(future_months * steps_per_month):
-        X_test = np.array([test_inputs[-50:]])
-        X_test = np.reshape(X_test, (X_test.shape[0], X_test.shape[1], 1))
-        pred_price = model.predict(X_test)
-        test_inputs = np.append(test_inputs, pred_price)
-        predictions.append(scaler.inverse_transform(pred_price))
+        X_test = np.reshape(test_inputs[-50:], (1, 50, n_features))
+        pred_scaled = model.predict(X_test)[0, 0]
+        row = np.zeros((1, n_features))
+        row[0, 0] = pred_scaled
+        pred_price = scaler.inverse_transform(row)[0, 0]
+        if stream is not None:
+            values = stream.update(pred_price, pred_price, pred_price, last_volume)
+            row = scaler.transform([[pred_price] + [values[name][0] for name in features]])
+        test_inputs = np.vstack([test_inputs, row])
+        predictions.append(pred_price)
 
     return np.array(predictions).reshape(-1, 1)
 
 # Example usage
 stock_name = "AAPL"
-data = fetch_data(stock_name)
-X_train, y_train, scaler = prepare_data(data)
-model = build_model((X_train.shape[1], 1))
-model.fit(X_train, y_train, epochs=20, batch_size=32)
+end_date = '2023-01-01'
+features = ['SMA', 'EMA', 'RSI', 'MACD', 'ATR']
+ohlcv = fetch_ohlcv(stock_name, end_date=end_date)
+data = feature_matrix(ohlcv, features)
+# Loads the saved model for this ticker/window/end date, fine-tunes the latest one
+# on the new tail, or trains from scratch if none exists
+model, scaler = get_model(stock_name, data, end_date, prepare_data, build_model, features=features, epochs=20)
 
 # Predict future prices
-future_prices = predict_future_prices(model, data, scaler)
+future_prices = predict_future_prices(model, data, scaler, ohlcv=ohlcv, features=features)
 plt.plot(future_prices)
 plt.title('Future Stock Prices')
 plt.xlabel('Time')
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+import joblib
+
+MODELS_DIR = 'models'
+# Bump when build_model's architecture changes so old artifacts are not reused
+MODEL_VERSION = 1
+
+_loaded = {}
+
+def data_hash(data):
+    return hashlib.md5(data.tobytes()).hexdigest()
+
+def params_key(n_steps, features, epochs):
+    spec = json.dumps({'n_steps': n_steps, 'features': features or [], 'epochs': epochs,
+                       'version': MODEL_VERSION}, sort_keys=True)
+    return hashlib.md5(spec.encode()).hexdigest()[:10]
+
+def artifact_dir(ticker, n_steps, features, epochs, end_date, models_dir=MODELS_DIR):
+    return os.path.join(models_dir, ticker, f"w{n_steps}_{params_key(n_steps, features, epochs)}_{end_date}")
+
+def read_meta(path):
+    meta_path = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+def save_artifact(path, model, scaler, meta):
+    os.makedirs(path, exist_ok=True)
+    model.save(os.path.join(path, 'model.keras'))
+    joblib.dump(scaler, os.path.join(path, 'scaler.joblib'))
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    _loaded[path] = (model, scaler)
+
+def load_artifact(path):
+    # Keras is only imported, and the model only read from disk, on first use
+    if path not in _loaded:
+        from keras.models import load_model
+        model = load_model(os.path.join(path, 'model.keras'))
+        scaler = joblib.load(os.path.join(path, 'scaler.joblib'))
+        _loaded[path] = (model, scaler)
+    return _loaded[path]
+
+def latest_artifact(ticker, n_steps, features, epochs, before, current_hash=None, models_dir=MODELS_DIR):
+    # Most recent artifact with the same hyperparameters trained on data ending before `before`,
+    # or on `before` itself when that data has since changed (Yahoo re-adjusts after dividends)
+    ticker_dir = os.path.join(models_dir, ticker)
+    if not os.path.isdir(ticker_dir):
+        return None
+    prefix = f"w{n_steps}_{params_key(n_steps, features, epochs)}_"
+    candidates = []
+    for name in os.listdir(ticker_dir):
+        path = os.path.join(ticker_dir, name)
+        meta = read_meta(path)
+        if not (name.startswith(prefix) and meta):
+            continue
+        if meta['end_date'] < before or (meta['end_date'] == before and meta['data_hash'] != current_hash):
+            candidates.append((meta['end_date'], path, meta))
+    return max(candidates) if candidates else None
+
+def get_model(ticker, data, end_date, prepare_data, build_model, n_steps=50, features=None,
+              epochs=20, fine_tune_epochs=2, batch_size=32, models_dir=MODELS_DIR):
+    path = artifact_dir(ticker, n_steps, features, epochs, end_date, models_dir)
+    meta = read_meta(path)
+    current_hash = data_hash(data)
+    if meta and meta['data_hash'] == current_hash:
+        return load_artifact(path)
+
+    previous = latest_artifact(ticker, n_steps, features, epochs, end_date, current_hash, models_dir)
+    if previous is not None:
+        # Fine-tune the last model on the new tail, keeping its scaler fixed
+        _, previous_path, previous_meta = previous
+        model, scaler = load_artifact(previous_path)
+        new_rows = max(len(data) - previous_meta['rows'], 1)
+        if previous_meta['end_date'] == end_date:
+            # Same dates with re-adjusted prices: the whole series moved, not just the tail
+            new_rows = len(data) - n_steps
+        X_tail, y_tail, _ = prepare_data(data[-(new_rows + n_steps):], n_steps, scaler=scaler)
+        model.fit(X_tail, y_tail, epochs=fine_tune_epochs, batch_size=batch_size)
+        _loaded.pop(previous_path, None)  # The cached object now holds the fine-tuned weights
+        trained = 'fine_tune'
+    else:
+        X_train, y_train, scaler = prepare_data(data, n_steps)
+        model = build_model((X_train.shape[1], X_train.shape[2]))
+        model.fit(X_train, y_train, epochs=epochs, batch_size=batch_size)
+        trained = 'full'
+
+    save_artifact(path, model, scaler, {
+        'ticker': ticker,
+        'n_steps': n_steps,
+        'features': features or [],
+        'epochs': epochs,
+        'version': MODEL_VERSION,
+        'end_date': end_date,
+        'rows': len(data),
+        'data_hash': current_hash,
+        'trained': trained,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+    })
+    return model, scaler
@@ -0,0 +1,389 @@
+import json
+import selectors
+import ssl
+import struct
+import threading
+import time
+import websocket
+from logzero import logger
+
+WEBSOCKET_URI = "wss://tns.angelone.in/smart-order-update"
+HEARTBEAT_MESSAGE = "ping"
+HEARTBEAT_INTERVAL = 10       # Seconds, same as SmartWebSocketOrderUpdate
+CONNECT_TIMEOUT = 3           # Seconds for the TCP+TLS+WebSocket handshake
+STREAM_READY_WAIT = 0.3       # Longest a placement waits for its account's stream to connect
+PENDING_TIMEOUT = 8 * 3600    # An order with no final update by then is marked unknown
+MAX_RETRIES = 2
+RETRY_DELAY = 5
+TERMINAL_STATUSES = {"complete", "rejected", "cancelled"}
+# Set locally when the stream gave up before an order's final update arrived
+UNKNOWN_STATUS = "unknown"
+FIELDS = ["orderid", "tradingsymbol", "transactiontype", "ordertype", "quantity", "filledshares",
+          "unfilledshares", "averageprice", "orderstatus", "text", "updatetime"]
+
+def parse_update(message):
+    # Order-update frames carry the order under "orderData"; acks and pongs don't
+    try:
+        data = json.loads(message)
+    except (TypeError, ValueError):
+        return None
+    order = data.get("orderData") if isinstance(data, dict) else None
+    if not order or not order.get("orderid"):
+        return None
+    return {field: order.get(field) for field in FIELDS if field in order}
+
+class OrderStateTable:
+    # Latest known state per order id, updated from the stream. Listeners are called
+    # on the channel thread, so GUI code should hand the ids over to its own loop.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.orders = {}
+        # The same state dicts indexed by account, so per-account queries don't scan every order
+        self.by_user = {}
+        self.listeners = []
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def record_placed(self, username, orderid, tradingsymbol=None, quantity=None):
+        self.apply(username, {"orderid": orderid, "tradingsymbol": tradingsymbol, "quantity": quantity,
+                              "orderstatus": "placed"})
+
+    def apply(self, username, update):
+        orderid = str(update["orderid"])
+        with self.lock:
+            state = self.orders.get(orderid)
+            if state is None:
+                state = self.orders[orderid] = {"username": username, "orderid": orderid}
+                self.by_user.setdefault(username, {})[orderid] = state
+            # Don't let the local "placed" marker overwrite a status that already streamed in
+            if update.get("orderstatus") == "placed" and state.get("orderstatus"):
+                update = {k: v for k, v in update.items() if k != "orderstatus"}
+            state.update({k: v for k, v in update.items() if v is not None and k != "orderid"})
+            state["received_at"] = time.time()
+            snapshot = dict(state)
+        for callback in self.listeners:
+            callback(snapshot)
+        return snapshot
+
+    def get(self, orderid):
+        with self.lock:
+            state = self.orders.get(str(orderid))
+            return dict(state) if state else None
+
+    def for_user(self, username):
+        with self.lock:
+            return [dict(state) for state in self.by_user.get(username, {}).values()]
+
+    def all_terminal(self, username):
+        with self.lock:
+            statuses = [state.get("orderstatus") for state in self.by_user.get(username, {}).values()]
+        return bool(statuses) and all(status in TERMINAL_STATUSES for status in statuses)
+
+def parse_frames(buffer):
+    # Splits complete RFC 6455 frames off the front of buffer; returns them as
+    # (fin, opcode, payload) along with the unconsumed rest
+    frames = []
+    while len(buffer) >= 2:
+        first, second = buffer[0], buffer[1]
+        length = second & 0x7F
+        offset = 2
+        if length == 126:
+            if len(buffer) < 4:
+                break
+            length = struct.unpack("!H", buffer[2:4])[0]
+            offset = 4
+        elif length == 127:
+            if len(buffer) < 10:
+                break
+            length = struct.unpack("!Q", buffer[2:10])[0]
+            offset = 10
+        mask = b""
+        if second & 0x80:
+            mask = buffer[offset:offset + 4]
+            offset += 4
+        if len(buffer) < offset + length:
+            break
+        payload = buffer[offset:offset + length]
+        if mask:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        frames.append((bool(first & 0x80), first & 0x0F, bytes(payload)))
+        buffer = buffer[offset + length:]
+    return frames, buffer
+
+class _Subscription:
+    def __init__(self, username, headers, release_when_done):
+        self.username = username
+        self.headers = headers
+        self.release_when_done = release_when_done
+        # One close callback per session sharing this socket, e.g. a logout per placed order
+        self.callbacks = []
+        # Orders still being placed on this subscription; it is never released while any are
+        self.holds = 0
+        # Orders placed through this subscription and not final yet, with the time they were placed.
+        # Only these keep it open, so a stale order from an earlier session can't.
+        self.pending = {}
+        # Set once the socket is up, or the channel gave up on it
+        self.ready = threading.Event()
+        self.closed = False
+        self.ws = None
+        self.retries = 0
+        self.buffer = b""
+        self.fragments = []
+
+class OrderUpdateChannel:
+    # One persistent order-update socket per account session, all served by a single
+    # selector thread instead of a thread per connection as in the SDK.
+    def __init__(self, table, url=WEBSOCKET_URI, heartbeat=HEARTBEAT_INTERVAL, sslopt=None,
+                 connect_timeout=CONNECT_TIMEOUT, pending_timeout=PENDING_TIMEOUT):
+        self.table = table
+        self.url = url
+        self.heartbeat = heartbeat
+        self.connect_timeout = connect_timeout
+        self.pending_timeout = pending_timeout
+        # Certificates are verified unless the caller says otherwise; ws:// URLs don't use TLS at all
+        self.sslopt = sslopt if sslopt is not None else {"cert_reqs": ssl.CERT_REQUIRED}
+        self.selector = selectors.DefaultSelector()
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def subscribe(self, username, auth_token, api_key, feed_token, on_close=None, release_when_done=True):
+        # Returns at once; the connect runs on its own thread, so it overlaps with symbol
+        # lookup and placement (wait on subscription.ready to bound that). An account already
+        # subscribed keeps its socket and gains on_close; either way the caller holds the
+        # subscription open until it calls release().
+        headers = {
+            "Authorization": auth_token,
+            "x-api-key": api_key,
+            "x-client-code": username,
+            "x-feed-token": feed_token or "",
+        }
+        with self.lock:
+            subscription = self.subscriptions.get(username)
+            new = subscription is None
+            if new:
+                subscription = _Subscription(username, headers, release_when_done)
+                self.subscriptions[username] = subscription
+            if on_close is not None:
+                subscription.callbacks.append(on_close)
+            subscription.holds += 1
+        if new:
+            threading.Thread(target=self._connect, args=(subscription,), daemon=True).start()
+        return subscription
+
+    def release(self, username, orderid=None):
+        # Drops one hold taken by subscribe, tracking orderid if an order was placed; the
+        # socket closes once nothing is being placed and all of its tracked orders are final
+        with self.lock:
+            subscription = self.subscriptions.get(username)
+            if subscription is None:
+                return
+            subscription.holds = max(subscription.holds - 1, 0)
+            if orderid is not None:
+                # Checked under the channel lock, so a final update being read right now
+                # either shows up here or removes the id after it's added
+                state = self.table.get(orderid)
+                if not state or state.get("orderstatus") not in TERMINAL_STATUSES:
+                    subscription.pending[str(orderid)] = time.time()
+        self._release_if_done(subscription)
+
+    def _release_if_done(self, subscription):
+        with self.lock:
+            done = subscription.release_when_done and subscription.holds == 0 and not subscription.pending
+        if done:
+            self._finish(subscription)
+
+    def _connect(self, subscription):
+        if subscription.closed:
+            return
+        try:
+            ws = websocket.create_connection(self.url, header=subscription.headers, sslopt=self.sslopt,
+                                             timeout=self.connect_timeout)
+            ws.settimeout(self.heartbeat)
+        except Exception as e:
+            logger.error(f"Order update connection failed for {subscription.username}: {e}")
+            self._retry(subscription)
+            return
+        with self.lock:
+            if subscription.closed:
+                ws.close()
+                return
+            subscription.ws = ws
+            subscription.retries = 0
+            subscription.buffer = b""
+            subscription.fragments = []
+            self.selector.register(ws.sock, selectors.EVENT_READ, subscription)
+        subscription.ready.set()
+        logger.debug(f"Order updates subscribed for {subscription.username}")
+
+    def _retry(self, subscription):
+        if not self.running or subscription.retries >= MAX_RETRIES:
+            self._finish(subscription)
+            return
+        subscription.retries += 1
+        timer = threading.Timer(RETRY_DELAY, self._connect, args=(subscription,))
+        timer.daemon = True
+        timer.start()
+
+    def _drop(self, subscription):
+        with self.lock:
+            if subscription.ws is not None:
+                try:
+                    self.selector.unregister(subscription.ws.sock)
+                except (KeyError, ValueError):
+                    pass
+                # ws.close() would wait for the server's close reply on the selector thread
+                try:
+                    subscription.ws.send_close()
+                except Exception:
+                    pass
+                subscription.ws.shutdown()
+                subscription.ws = None
+
+    def _finish(self, subscription):
+        self._drop(subscription)
+        with self.lock:
+            if subscription.closed:
+                return
+            subscription.closed = True
+            if self.subscriptions.get(subscription.username) is subscription:
+                del self.subscriptions[subscription.username]
+            callbacks = list(subscription.callbacks)
+            abandoned = list(subscription.pending)
+            subscription.pending.clear()
+        subscription.ready.set()
+        if abandoned:
+            logger.warning(f"Stopped tracking {len(abandoned)} open orders for {subscription.username}")
+        for orderid in abandoned:
+            self.table.apply(subscription.username, {"orderid": orderid, "orderstatus": UNKNOWN_STATUS})
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Order update close callback failed for {subscription.username}: {e}")
+
+    def unsubscribe(self, username):
+        # Closes the account's socket now, whatever is still open or being placed
+        with self.lock:
+            subscription = self.subscriptions.get(username)
+        if subscription is not None:
+            self._finish(subscription)
+
+    def _receive(self, ws):
+        # Everything readable right now, without waiting: a slow or half-sent frame on
+        # one socket must not hold up the other accounts on this thread
+        sock = ws.sock
+        chunks = []
+        sock.settimeout(0)
+        try:
+            while True:
+                try:
+                    chunk = sock.recv(65536)
+                except (BlockingIOError, ssl.SSLWantReadError):
+                    break
+                if not chunk:
+                    raise websocket.WebSocketConnectionClosedException("closed by server")
+                chunks.append(chunk)
+        finally:
+            sock.settimeout(self.heartbeat)
+        return b"".join(chunks)
+
+    def _read(self, subscription):
+        ws = subscription.ws
+        if ws is None:
+            return
+        finished = []
+        try:
+            frames, subscription.buffer = parse_frames(subscription.buffer + self._receive(ws))
+            for fin, opcode, payload in frames:
+                if opcode == websocket.ABNF.OPCODE_CLOSE:
+                    raise websocket.WebSocketConnectionClosedException("closed by server")
+                if opcode == websocket.ABNF.OPCODE_PING:
+                    ws.pong(payload)
+                    continue
+                if opcode == websocket.ABNF.OPCODE_PONG:
+                    continue
+                subscription.fragments.append(payload)
+                if not fin:
+                    continue
+                message = b"".join(subscription.fragments).decode("utf-8", errors="replace")
+                subscription.fragments = []
+                update = parse_update(message)
+                if update is not None:
+                    self.table.apply(subscription.username, update)
+                    if update.get("orderstatus") in TERMINAL_STATUSES:
+                        finished.append(str(update["orderid"]))
+        except (OSError, websocket.WebSocketException) as e:
+            error = e
+        else:
+            error = None
+        # Before any retry gives up, so these aren't marked unknown
+        with self.lock:
+            for orderid in finished:
+                subscription.pending.pop(orderid, None)
+        if error is not None:
+            logger.warning(f"Order update stream for {subscription.username} dropped: {error}")
+            self._drop(subscription)
+            self._retry(subscription)
+        elif finished:
+            self._release_if_done(subscription)
+
+    def _expire_pending(self):
+        # Orders that never got a final update (missed while disconnected, say) are
+        # marked unknown, so they don't hold the socket and session open forever
+        cutoff = time.time() - self.pending_timeout
+        expired = []
+        with self.lock:
+            for subscription in self.subscriptions.values():
+                stale = [orderid for orderid, placed in subscription.pending.items() if placed < cutoff]
+                for orderid in stale:
+                    del subscription.pending[orderid]
+                if stale:
+                    expired.append((subscription, stale))
+        for subscription, stale in expired:
+            for orderid in stale:
+                self.table.apply(subscription.username, {"orderid": orderid, "orderstatus": UNKNOWN_STATUS})
+            self._release_if_done(subscription)
+
+    def _send_heartbeats(self):
+        with self.lock:
+            subscriptions = list(self.subscriptions.values())
+        for subscription in subscriptions:
+            if subscription.ws is not None:
+                try:
+                    subscription.ws.send(HEARTBEAT_MESSAGE)
+                except Exception as e:
+                    logger.warning(f"Heartbeat failed for {subscription.username}: {e}")
+
+    def _run(self):
+        last_heartbeat = time.monotonic()
+        while self.running:
+            with self.lock:
+                has_sockets = bool(self.selector.get_map())
+            if not has_sockets:
+                time.sleep(0.05)
+                events = []
+            else:
+                events = self.selector.select(timeout=0.5)
+            for key, _ in events:
+                self._read(key.data)
+            # TLS can hold decrypted bytes (e.g. read along with the handshake) that select() won't report
+            with self.lock:
+                buffered = [sub for sub in self.subscriptions.values()
+                            if sub.ws is not None and getattr(sub.ws.sock, "pending", lambda: 0)()]
+            for subscription in buffered:
+                self._read(subscription)
+            if time.monotonic() - last_heartbeat >= self.heartbeat:
+                self._send_heartbeats()
+                self._expire_pending()
+                last_heartbeat = time.monotonic()
+
+    def close(self):
+        self.running = False
+        with self.lock:
+            subscriptions = list(self.subscriptions.values())
+        for subscription in subscriptions:
+            self._finish(subscription)
@@ -0,0 +1,421 @@
+import argparse
+import csv
+import heapq
+import itertools
+import os
+import threading
+import time
+import uuid
+from logzero import logger
+
+ACCOUNTS_FILE = 'data.csv'
+# Last prices per stock; screener.csv's last_price column is used when there is no price file
+PRICES_FILES = ['paper_prices.csv', 'screener.csv']
+# Per-symbol bar history replayed into the broker; fill it with `python paper_trading.py`
+BARS_DIR = 'paper_bars'
+TICKERS_FILE = 'StockStreamTickersData.csv'
+
+def base_symbol(symbol):
+    # RELIANCE-EQ, RELIANCE.NS and reliance all map to RELIANCE
+    symbol = symbol.upper()
+    for suffix in ('-EQ', '.NS', '.BO'):
+        if symbol.endswith(suffix):
+            return symbol[:-len(suffix)]
+    return symbol
+
+class Account:
+    def __init__(self, username, password, api_key, funds):
+        self.username = username
+        self.password = password
+        self.api_key = api_key
+        self.funds = funds
+        self.reserved = 0.0
+        self.positions = {}
+        self.reserved_qty = {}
+
+class PaperBroker:
+    # Matches orders against local last prices, one lock around all state.
+    # Resting LIMIT orders sit in per-symbol heaps and fill when update_price crosses them.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.accounts = {}
+        self.prices = {}
+        self.orders = {}
+        self.buy_book = {}
+        self.sell_book = {}
+        self.order_ids = itertools.count(1)
+        # Called with each order whose status changed, outside the lock
+        self.listeners = []
+        # Optional PriceReplay that starts replaying a symbol's stored bars the first time it is traded
+        self.feed = None
+
+    def add_account(self, username, password='', api_key='', funds=0.0):
+        self.accounts[username] = Account(username, password, api_key, float(funds))
+
+    def load_accounts(self, path=ACCOUNTS_FILE):
+        with open(path, newline='') as csvfile:
+            for row in csv.DictReader(csvfile):
+                self.add_account(row['username'], row['password'], row['api_key'], row['available_funds'])
+
+    def load_prices(self, path):
+        with open(path, newline='', encoding='utf-8-sig') as csvfile:
+            for row in csv.DictReader(csvfile):
+                price = row.get('price') or row.get('last_price')
+                if row.get('symbol') and price:
+                    self.prices[base_symbol(row['symbol'])] = float(price)
+
+    def authenticate(self, username, password, api_key=None):
+        account = self.accounts.get(username)
+        if account is None or account.password != password:
+            return None
+        if api_key and account.api_key and account.api_key != api_key:
+            return None
+        return account
+
+    def place_order(self, username, orderparams):
+        symbol = base_symbol(orderparams['tradingsymbol'])
+        if self.feed is not None:
+            self.feed.track(symbol)
+        side = orderparams['transactiontype'].upper()
+        order_type = orderparams['ordertype'].upper()
+        quantity = int(orderparams['quantity'])
+        limit = float(orderparams.get('price') or 0)
+        order = {
+            'orderid': str(next(self.order_ids)),
+            'uniqueorderid': str(uuid.uuid4()),
+            'username': username,
+            'tradingsymbol': orderparams['tradingsymbol'],
+            'symboltoken': orderparams.get('symboltoken', ''),
+            'exchange': orderparams.get('exchange', ''),
+            'transactiontype': side,
+            'ordertype': order_type,
+            'producttype': orderparams.get('producttype', 'DELIVERY'),
+            'quantity': quantity,
+            'price': limit,
+            'filledshares': 0,
+            'averageprice': 0.0,
+            'status': 'open',
+            'text': '',
+            'updatetime': time.time(),
+        }
+        with self.lock:
+            self.orders[order['orderid']] = order
+            self._submit(self.accounts[username], symbol, order)
+            changed = dict(order)
+        self._notify([changed])
+        return order
+
+    def _notify(self, orders):
+        for listener in self.listeners:
+            for order in orders:
+                listener(order)
+
+    def _reject(self, order, reason):
+        order['status'] = 'rejected'
+        order['text'] = reason
+
+    def _submit(self, account, symbol, order):
+        quantity, side = order['quantity'], order['transactiontype']
+        last = self.prices.get(symbol)
+        if quantity <= 0:
+            return self._reject(order, 'Invalid quantity')
+        if last is None:
+            return self._reject(order, f'No price data for {symbol}')
+        if order['ordertype'] == 'LIMIT' and order['price'] <= 0:
+            return self._reject(order, 'Invalid limit price')
+        if order['ordertype'] not in ('MARKET', 'LIMIT'):
+            return self._reject(order, f"Unsupported order type {order['ordertype']}")
+
+        crosses = (order['ordertype'] == 'MARKET'
+                   or (side == 'BUY' and last <= order['price'])
+                   or (side == 'SELL' and last >= order['price']))
+        # Resting buys reserve funds at the limit price, resting delivery sells reserve holdings
+        if side == 'BUY':
+            cost = quantity * (last if crosses else order['price'])
+            if cost > account.funds - account.reserved:
+                return self._reject(order, 'Insufficient funds')
+        elif order['producttype'] == 'DELIVERY':
+            free = account.positions.get(symbol, 0) - account.reserved_qty.get(symbol, 0)
+            if quantity > free:
+                return self._reject(order, 'Insufficient holdings')
+
+        if crosses:
+            self._fill(account, symbol, order, last)
+        elif side == 'BUY':
+            account.reserved += quantity * order['price']
+            heapq.heappush(self.buy_book.setdefault(symbol, []), (-order['price'], int(order['orderid'])))
+        else:
+            if order['producttype'] == 'DELIVERY':
+                account.reserved_qty[symbol] = account.reserved_qty.get(symbol, 0) + quantity
+            heapq.heappush(self.sell_book.setdefault(symbol, []), (order['price'], int(order['orderid'])))
+
+    def _fill(self, account, symbol, order, price):
+        quantity = order['quantity']
+        if order['transactiontype'] == 'BUY':
+            account.funds -= quantity * price
+            account.positions[symbol] = account.positions.get(symbol, 0) + quantity
+        else:
+            account.funds += quantity * price
+            account.positions[symbol] = account.positions.get(symbol, 0) - quantity
+        order['filledshares'] = quantity
+        order['averageprice'] = price
+        order['status'] = 'complete'
+        order['updatetime'] = time.time()
+
+    def update_price(self, symbol, price):
+        symbol = base_symbol(symbol)
+        filled = []
+        with self.lock:
+            self.prices[symbol] = price
+            buys = self.buy_book.get(symbol, [])
+            while buys and -buys[0][0] >= price:
+                _, orderid = heapq.heappop(buys)
+                order = self.orders[str(orderid)]
+                if order['status'] == 'open':
+                    account = self.accounts[order['username']]
+                    account.reserved -= order['quantity'] * order['price']
+                    self._fill(account, symbol, order, price)
+                    filled.append(dict(order))
+            sells = self.sell_book.get(symbol, [])
+            while sells and sells[0][0] <= price:
+                _, orderid = heapq.heappop(sells)
+                order = self.orders[str(orderid)]
+                if order['status'] == 'open':
+                    account = self.accounts[order['username']]
+                    self._release_holdings(account, symbol, order)
+                    self._fill(account, symbol, order, price)
+                    filled.append(dict(order))
+        self._notify(filled)
+
+    def _release_holdings(self, account, symbol, order):
+        if order['producttype'] == 'DELIVERY':
+            account.reserved_qty[symbol] -= order['quantity']
+
+    def cancel_order(self, username, orderid):
+        with self.lock:
+            order = self.orders.get(orderid)
+            if order is None or order['username'] != username or order['status'] != 'open':
+                return None
+            # Heap entries are skipped lazily once the order is no longer open
+            account = self.accounts[username]
+            if order['transactiontype'] == 'BUY':
+                account.reserved -= order['quantity'] * order['price']
+            else:
+                self._release_holdings(account, base_symbol(order['tradingsymbol']), order)
+            order['status'] = 'cancelled'
+            order['updatetime'] = time.time()
+            cancelled = dict(order)
+        self._notify([cancelled])
+        return cancelled
+
+    def order_book(self, username):
+        with self.lock:
+            return [dict(order) for order in self.orders.values() if order['username'] == username]
+
+    def funds(self, username):
+        with self.lock:
+            account = self.accounts[username]
+            return {'net': account.funds, 'availablecash': account.funds - account.reserved}
+
+    def positions(self, username):
+        with self.lock:
+            return dict(self.accounts[username].positions)
+
+def bars_path(symbol, bars_dir=BARS_DIR):
+    return os.path.join(bars_dir, f"{base_symbol(symbol)}.csv")
+
+def fetch_bars(symbol, bars_dir=BARS_DIR):
+    # Saves the last few sessions of 1-minute bars (daily bars if Yahoo has no intraday
+    # data) for offline replay; returns how many bars were written
+    import yfinance as yf
+    ticker = f"{base_symbol(symbol)}.NS"
+    data = yf.download(ticker, period='5d', interval='1m', progress=False)
+    if data.empty:
+        data = yf.download(ticker, period='1y', progress=False)
+    if data.empty:
+        return 0
+    close = data['Close']
+    if close.ndim > 1:
+        close = close.iloc[:, 0]
+    close = close.dropna().rename('close')
+    os.makedirs(bars_dir, exist_ok=True)
+    close.to_csv(bars_path(symbol, bars_dir), index_label='time')
+    return len(close)
+
+def load_bars(symbol, bars_dir=BARS_DIR):
+    # Closes from the stored bar file only; never touches the network
+    path = bars_path(symbol, bars_dir)
+    if not os.path.exists(path):
+        return []
+    with open(path, newline='') as csvfile:
+        return [float(row['close']) for row in csv.DictReader(csvfile) if row.get('close')]
+
+class PriceReplay:
+    # Steps every tracked symbol one stored bar per `interval` seconds through update_price,
+    # so resting LIMIT orders fill as the replayed prices cross them. Loops at the end.
+    def __init__(self, paper_broker, interval=1.0, bars_dir=BARS_DIR):
+        self.broker = paper_broker
+        self.interval = interval
+        self.bars_dir = bars_dir
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        self.bars = {}
+        self.positions = {}
+        self.running = False
+
+    def track(self, symbol):
+        symbol = base_symbol(symbol)
+        if symbol in self.bars:
+            return
+        with self.load_lock:
+            if symbol in self.bars:
+                return
+            try:
+                bars = load_bars(symbol, self.bars_dir)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Paper bars for {symbol} unreadable: {e}")
+                bars = []
+            if bars:
+                self.broker.update_price(symbol, bars[0])
+            else:
+                # A price seeded from the price files, if any, stays as it is
+                logger.warning(f"No paper bars for {symbol} in {self.bars_dir}; its price won't move")
+            with self.lock:
+                self.positions[symbol] = 0
+                self.bars[symbol] = bars
+
+    def step(self):
+        with self.lock:
+            moves = []
+            for symbol, bars in self.bars.items():
+                if len(bars) > 1:
+                    self.positions[symbol] = (self.positions[symbol] + 1) % len(bars)
+                    moves.append((symbol, bars[self.positions[symbol]]))
+        for symbol, price in moves:
+            self.broker.update_price(symbol, price)
+
+    def start(self):
+        self.running = True
+
+        def loop():
+            while self.running:
+                time.sleep(self.interval)
+                self.step()
+
+        threading.Thread(target=loop, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+
+class PaperSmartConnect:
+    # Same calls and response shapes as the SmartConnect methods place_order uses
+    def __init__(self, api_key, paper_broker):
+        self.api_key = api_key
+        self.broker = paper_broker
+        self.username = None
+
+    def generateSession(self, clientCode, password, totp):
+        if self.broker.authenticate(clientCode, password, self.api_key) is None:
+            return {'status': False, 'message': 'Invalid credentials', 'errorcode': 'AB1007', 'data': None}
+        self.username = clientCode
+        token = uuid.uuid4().hex
+        return {'status': True, 'message': 'SUCCESS', 'errorcode': '',
+                'data': {'jwtToken': f'paper-{token}', 'refreshToken': f'paper-{token}', 'feedToken': token}}
+
+    def placeOrderFullResponse(self, orderparams):
+        order = self.broker.place_order(self.username, orderparams)
+        return {'status': True, 'message': 'SUCCESS', 'errorcode': '',
+                'data': {'script': order['tradingsymbol'], 'orderid': order['orderid'],
+                         'uniqueorderid': order['uniqueorderid']}}
+
+    def placeOrder(self, orderparams):
+        return self.placeOrderFullResponse(orderparams)['data']['orderid']
+
+    def cancelOrder(self, order_id, variety):
+        order = self.broker.cancel_order(self.username, order_id)
+        if order is None:
+            return {'status': False, 'message': 'Order not open', 'errorcode': 'AB4008', 'data': None}
+        return {'status': True, 'message': 'SUCCESS', 'errorcode': '', 'data': {'orderid': order_id}}
+
+    def orderBook(self):
+        return {'status': True, 'message': 'SUCCESS', 'errorcode': '', 'data': self.broker.order_book(self.username)}
+
+    def rmsLimit(self):
+        return {'status': True, 'message': 'SUCCESS', 'errorcode': '', 'data': self.broker.funds(self.username)}
+
+    def position(self):
+        return {'status': True, 'message': 'SUCCESS', 'errorcode': '', 'data': self.broker.positions(self.username)}
+
+    def terminateSession(self, clientCode):
+        self.username = None
+        return {'status': True, 'message': 'SUCCESS', 'errorcode': '', 'data': 'Logout Successfully'}
+
+def order_data(order):
+    # The orderData shape of Angel's order-update stream
+    return {
+        'orderid': order['orderid'],
+        'tradingsymbol': order['tradingsymbol'],
+        'transactiontype': order['transactiontype'],
+        'ordertype': order['ordertype'],
+        'quantity': str(order['quantity']),
+        'filledshares': str(order['filledshares']),
+        'unfilledshares': str(order['quantity'] - order['filledshares']),
+        'averageprice': order['averageprice'],
+        'orderstatus': order['status'],
+        'text': order['text'],
+        'updatetime': time.strftime('%d-%b-%Y %H:%M:%S', time.localtime(order['updatetime'])),
+    }
+
+def symbol_token(stock_name, exchange):
+    # Stand-in for the scrip master lookup, so paper mode works offline
+    name = base_symbol(stock_name)
+    trading_symbol = f"{name}-EQ" if exchange.upper() == "NSE" else name
+    return trading_symbol, f"paper-{name}"
+
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_broker():
+    # Seeded lazily from data.csv and the first local price file found, then kept
+    # moving by a PriceReplay stepping every PAPER_REPLAY_SECONDS (0 disables it)
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = PaperBroker()
+            if os.path.exists(ACCOUNTS_FILE):
+                _broker.load_accounts(ACCOUNTS_FILE)
+            for path in PRICES_FILES:
+                if os.path.exists(path):
+                    _broker.load_prices(path)
+                    break
+            _broker.feed = PriceReplay(_broker, interval=float(os.environ.get('PAPER_REPLAY_SECONDS', '1')))
+            if _broker.feed.interval > 0:
+                _broker.feed.start()
+        return _broker
+
+def connect(api_key):
+    return PaperSmartConnect(api_key, get_broker())
+
+def main():
+    parser = argparse.ArgumentParser(description="Download bar history for paper-trading replay")
+    parser.add_argument('--symbols', nargs='*', help="Defaults to every ticker in StockStreamTickersData.csv")
+    parser.add_argument('--limit', type=int, help="Only fetch the first N tickers")
+    parser.add_argument('--bars-dir', default=BARS_DIR)
+    args = parser.parse_args()
+
+    symbols = args.symbols
+    if not symbols:
+        with open(TICKERS_FILE, newline='', encoding='utf-8-sig') as csvfile:
+            symbols = [row['Symbol'] for row in csv.DictReader(csvfile) if row.get('Symbol')]
+    if args.limit:
+        symbols = symbols[:args.limit]
+    for symbol in symbols:
+        try:
+            count = fetch_bars(symbol, args.bars_dir)
+        except Exception as e:
+            logger.warning(f"Fetching bars for {symbol} failed: {e}")
+            continue
+        print(f"{base_symbol(symbol)}: {count} bars")
+
+if __name__ == '__main__':
+    main()
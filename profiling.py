@@ -0,0 +1,110 @@
+import cProfile
+import heapq
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+import numpy as np
+from flask import jsonify, request
+
+WINDOW = 500            # Requests kept per route for the rolling percentiles
+SLOWEST_KEPT = 5        # cProfile dumps kept per route
+PROFILES_DIR = 'profiles'
+
+# Stage timings for the request running on this thread; None outside profiled requests
+_local = threading.local()
+_lock = threading.Lock()
+_totals = defaultdict(lambda: deque(maxlen=WINDOW))
+_stages = defaultdict(lambda: defaultdict(lambda: deque(maxlen=WINDOW)))
+_slowest = defaultdict(list)
+
+@contextmanager
+def stage(name):
+    timings = getattr(_local, 'timings', None)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            elapsed = (time.perf_counter() - start) * 1000
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+def _percentiles(values):
+    values = np.fromiter(values, dtype=float)
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {'count': len(values), 'p50': p50, 'p90': p90, 'p99': p99, 'max': values.max()}
+
+def snapshot():
+    with _lock:
+        return {
+            route: dict(_percentiles(totals),
+                        stages={name: _percentiles(values) for name, values in _stages[route].items()},
+                        slowest_profiles=[path for _, path in sorted(_slowest[route], reverse=True)])
+            for route, totals in _totals.items()
+        }
+
+def _keep_if_slow(route, total, profiler):
+    # Min-heap of the slowest requests; evicted dumps are deleted from disk
+    heap = _slowest[route]
+    if len(heap) >= SLOWEST_KEPT and total <= heap[0][0]:
+        return
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    name = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_')
+    path = os.path.join(PROFILES_DIR, f"{name}_{int(total)}ms_{int(time.time() * 1000)}.prof")
+    profiler.dump_stats(path)
+    with _lock:
+        heapq.heappush(heap, (total, path))
+        if len(heap) > SLOWEST_KEPT:
+            _, evicted = heapq.heappop(heap)
+            if os.path.exists(evicted):
+                os.remove(evicted)
+
+def init_profiling(app, sample_slow=False):
+    @app.before_request
+    def start_timing():
+        _local.timings = {}
+        _local.start = time.perf_counter()
+        _local.profiler = None
+        if sample_slow:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                _local.profiler = profiler
+            except ValueError:
+                pass  # Another profiler is already active on this thread
+
+    @app.after_request
+    def finish_timing(response):
+        timings = getattr(_local, 'timings', None)
+        if timings is None:
+            return response
+        total = (time.perf_counter() - _local.start) * 1000
+        profiler = _local.profiler
+        if profiler is not None:
+            profiler.disable()
+
+        route = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+        entries = [f"{name};dur={ms:.1f}" for name, ms in timings.items()]
+        response.headers['Server-Timing'] = ', '.join(entries + [f"total;dur={total:.1f}"])
+
+        with _lock:
+            _totals[route].append(total)
+            for name, ms in timings.items():
+                _stages[route][name].append(ms)
+        if profiler is not None:
+            _keep_if_slow(route, total, profiler)
+        return response
+
+    @app.teardown_request
+    def clear_timing(exc=None):
+        profiler = getattr(_local, 'profiler', None)
+        if profiler is not None:
+            profiler.disable()
+        _local.timings = None
+        _local.profiler = None
+
+    @app.route('/metrics')
+    def metrics():
+        return jsonify(snapshot())
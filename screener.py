@@ -0,0 +1,152 @@
+import argparse
+import os
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from logzero import logger
+from forecast import load_history, run_forecast
+
+SCREENER_FILE = 'screener.csv'
+TICKERS_FILE = 'StockStreamTickersData.csv'
+COLUMNS = ['symbol', 'company', 'last_price', 'predicted_price', 'expected_change', 'band_width',
+           'recommendation', 'updated_at']
+# A build covering less of the universe than this (e.g. during a network outage)
+# doesn't replace an existing table
+MIN_COVERAGE = 0.5
+
+def load_universe(path=TICKERS_FILE):
+    stocks = pd.read_csv(path, encoding='utf-8-sig').dropna(subset=['Symbol'])
+    return stocks.set_index('Symbol')['Company Name'].to_dict()
+
+def screen_ticker(symbol, horizon=30, uncertainty_samples=100, period='5y'):
+    df = load_history(symbol, period=period).dropna()
+    # Fast mode with a small sample count: enough for a band, no plot
+    result = run_forecast(df, horizon, fast=True, uncertainty_samples=uncertainty_samples)
+    band_width = None
+    if result['yhat_upper'] is not None:
+        band_width = (result['yhat_upper'] - result['yhat_lower']) / result['predicted_price'] * 100
+    return {
+        'symbol': symbol,
+        'last_price': result['current_price'],
+        'predicted_price': result['predicted_price'],
+        'expected_change': result['percentage_change'],
+        'band_width': band_width,
+        'recommendation': result['recommendation'],
+    }
+
+def _screen_safe(symbol, **kwargs):
+    try:
+        return screen_ticker(symbol, **kwargs)
+    except Exception as e:
+        logger.warning(f"Screener skipped {symbol}: {e}")
+        return None
+
+def build_screener(universe=None, workers=None, output=SCREENER_FILE, **kwargs):
+    universe = universe or load_universe()
+    rows = []
+    # Spawned workers, since this also runs from a thread inside the multithreaded Flask process
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [executor.submit(_screen_safe, symbol, **kwargs) for symbol in universe]
+        for future in as_completed(futures):
+            row = future.result()
+            if row is not None:
+                rows.append(row)
+
+    if not rows or (len(rows) < MIN_COVERAGE * len(universe) and os.path.exists(output)):
+        logger.error(f"Screener build covered {len(rows)} of {len(universe)} tickers; keeping the existing table")
+        return None
+
+    table = pd.DataFrame(rows, columns=COLUMNS)
+    table['company'] = table['symbol'].map(universe)
+    table['updated_at'] = pd.Timestamp.now().isoformat(timespec='seconds')
+    table = table.sort_values('expected_change', ascending=False, ignore_index=True)
+    # Write then swap so readers never see a half-written table
+    tmp = output + '.tmp'
+    table.to_csv(tmp, index=False)
+    os.replace(tmp, output)
+    return table
+
+class ScreenerTable:
+    # Holds the precomputed rankings in memory and reloads them when the file changes
+    def __init__(self, path=SCREENER_FILE):
+        self.path = path
+        self.mtime = None
+        self.table = pd.DataFrame(columns=COLUMNS)
+        self.lock = threading.Lock()
+
+    def get(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except FileNotFoundError:
+            return self.table
+        with self.lock:
+            if mtime != self.mtime:
+                self.table = pd.read_csv(self.path)
+                self.mtime = mtime
+        return self.table
+
+    def query(self, sort='expected_change', ascending=False, recommendation=None, min_change=None,
+              max_change=None, max_band=None, search=None, limit=None):
+        table = self.get()
+        mask = pd.Series(True, index=table.index)
+        if recommendation:
+            mask &= table['recommendation'] == recommendation
+        if min_change is not None:
+            mask &= table['expected_change'] >= min_change
+        if max_change is not None:
+            mask &= table['expected_change'] <= max_change
+        if max_band is not None:
+            mask &= table['band_width'] <= max_band
+        if search:
+            mask &= (table['symbol'].str.contains(search, case=False, regex=False)
+                     | table['company'].str.contains(search, case=False, regex=False, na=False))
+        result = table[mask]
+        if sort in table.columns:
+            result = result.sort_values(sort, ascending=ascending)
+        return result.head(limit) if limit else result
+
+def start_refresh(interval_hours, **kwargs):
+    # Rebuild the table in the background every interval_hours, starting only once the
+    # existing table is that old, so restarting the app doesn't redo a fresh build
+    output = kwargs.get('output', SCREENER_FILE)
+    interval = interval_hours * 3600
+
+    def loop():
+        try:
+            age = time.time() - os.path.getmtime(output)
+        except FileNotFoundError:
+            age = interval
+        if age < interval:
+            time.sleep(interval - age)
+        while True:
+            try:
+                build_screener(**kwargs)
+            except Exception as e:
+                logger.error(f"Screener refresh failed: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+    return thread
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute forecast rankings for the ticker universe")
+    parser.add_argument('--limit', type=int, help="Only screen the first N tickers")
+    parser.add_argument('--horizon', type=int, default=30, help="Forecast horizon in days")
+    parser.add_argument('--uncertainty-samples', type=int, default=100)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--output', default=SCREENER_FILE)
+    args = parser.parse_args()
+
+    universe = load_universe()
+    if args.limit:
+        universe = dict(list(universe.items())[:args.limit])
+    table = build_screener(universe, workers=args.workers, output=args.output, horizon=args.horizon,
+                           uncertainty_samples=args.uncertainty_samples)
+    if table is not None:
+        print(table.head(20).to_string())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+import socket
+import time
+import pytest
+import order_updates
+from fake_order_server import FakeOrderUpdateServer
+from order_updates import OrderStateTable, OrderUpdateChannel
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+@pytest.fixture
+def server():
+    server = FakeOrderUpdateServer()
+    yield server
+    server.close()
+
+@pytest.fixture
+def table():
+    return OrderStateTable()
+
+@pytest.fixture
+def channel(server, table):
+    channel = OrderUpdateChannel(table, url=server.url)
+    yield channel
+    channel.close()
+
+def order(orderid, status):
+    return {"orderid": orderid, "tradingsymbol": "RELIANCE-EQ", "quantity": "1", "orderstatus": status}
+
+def test_update_reaches_table_and_releases_when_final(server, table, channel):
+    closed = []
+    channel.subscribe("A1", "jwt", "key", "feed", on_close=lambda: closed.append("A1"))
+    assert wait_for(lambda: server.connected("A1"))
+    table.record_placed("A1", "101", "RELIANCE-EQ", 1)
+    channel.release("A1", "101")
+
+    server.push("A1", order("101", "open"))
+    assert wait_for(lambda: (table.get("101") or {}).get("orderstatus") == "open")
+    assert closed == []
+
+    server.push("A1", order("101", "complete"))
+    assert wait_for(lambda: closed == ["A1"])
+    assert table.get("101")["orderstatus"] == "complete"
+    assert wait_for(lambda: server.connected("A1") == 0)
+
+def test_release_without_orders_closes_immediately(server, channel):
+    closed = []
+    channel.subscribe("A1", "jwt", "key", "feed", on_close=lambda: closed.append("A1"))
+    channel.release("A1")
+    assert closed == ["A1"]
+
+def test_resubscribe_chains_close_callbacks(server, table, channel):
+    closed = []
+    channel.subscribe("A1", "jwt", "key", "feed", on_close=lambda: closed.append("first"))
+    assert wait_for(lambda: server.connected("A1"))
+    table.record_placed("A1", "101")
+    channel.release("A1", "101")
+    channel.subscribe("A1", "jwt2", "key", "feed", on_close=lambda: closed.append("second"))
+    table.record_placed("A1", "102")
+    channel.release("A1", "102")
+    assert server.connected("A1") == 1
+
+    server.push("A1", order("101", "complete"))
+    server.push("A1", order("102", "rejected"))
+    assert wait_for(lambda: sorted(closed) == ["first", "second"])
+
+def test_server_ping_does_not_delay_other_accounts(server, table, channel):
+    for username in ("A1", "B1"):
+        channel.subscribe(username, "jwt", "key", "feed", release_when_done=False)
+        table.record_placed(username, f"{username}-1")
+    assert wait_for(lambda: server.connected("A1") and server.connected("B1"))
+
+    server.ping("A1")
+    start = time.monotonic()
+    server.push("B1", order("B1-1", "complete"))
+    assert wait_for(lambda: table.get("B1-1")["orderstatus"] == "complete", timeout=2.0)
+    assert time.monotonic() - start < 1.0
+    # A1 stayed connected and still receives updates
+    server.push("A1", order("A1-1", "complete"))
+    assert wait_for(lambda: table.get("A1-1")["orderstatus"] == "complete", timeout=2.0)
+    assert server.connected("A1") == 1
+
+def test_subscribe_does_not_wait_for_the_handshake(table):
+    # Accepts TCP but never answers the WebSocket handshake
+    silent = socket.socket()
+    silent.bind(("127.0.0.1", 0))
+    silent.listen(1)
+    channel = OrderUpdateChannel(table, url=f"ws://127.0.0.1:{silent.getsockname()[1]}/", connect_timeout=0.2)
+    try:
+        start = time.monotonic()
+        subscription = channel.subscribe("A1", "jwt", "key", "feed")
+        assert time.monotonic() - start < 0.1
+        assert not subscription.ready.wait(0.05)
+    finally:
+        channel.close()
+        silent.close()
+
+def test_stale_order_does_not_hold_a_new_session(server, table, channel):
+    table.record_placed("B1", "old")
+    closed = []
+    channel.subscribe("B1", "jwt", "key", "feed", on_close=lambda: closed.append("B1"))
+    assert wait_for(lambda: server.connected("B1"))
+    table.record_placed("B1", "201")
+    channel.release("B1", "201")
+    server.push("B1", order("201", "complete"))
+    assert wait_for(lambda: closed == ["B1"])
+    assert wait_for(lambda: server.connected("B1") == 0)
+
+def test_giving_up_marks_open_orders_unknown(server, table, monkeypatch):
+    monkeypatch.setattr(order_updates, "MAX_RETRIES", 0)
+    channel = OrderUpdateChannel(table, url=server.url)
+    closed = []
+    try:
+        channel.subscribe("C1", "jwt", "key", "feed", on_close=lambda: closed.append("C1"))
+        assert wait_for(lambda: server.connected("C1"))
+        table.record_placed("C1", "301")
+        channel.release("C1", "301")
+        server.close()
+        assert wait_for(lambda: closed == ["C1"])
+        assert table.get("301")["orderstatus"] == "unknown"
+    finally:
+        channel.close()
+
+def test_pending_orders_expire(server, table):
+    channel = OrderUpdateChannel(table, url=server.url, pending_timeout=0)
+    closed = []
+    try:
+        channel.subscribe("D1", "jwt", "key", "feed", on_close=lambda: closed.append("D1"))
+        table.record_placed("D1", "401")
+        channel.release("D1", "401")
+        channel._expire_pending()
+        assert closed == ["D1"]
+        assert table.get("401")["orderstatus"] == "unknown"
+    finally:
+        channel.close()